@@ -71,6 +71,8 @@ def test_terminology_parsing():
     
     # 使用示例响应测试解析功能
     char_added, noun_added, expr_added = term_manager.update_terminology_from_api_response(SAMPLE_RESPONSE)
+    # 更新后的写盘会被合并推迟，检查文件前立即写入
+    term_manager.flush(force=True)
     
     # 打印结果
     print("\n====== 测试结果 ======")
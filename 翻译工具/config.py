@@ -75,6 +75,25 @@ RETRY_DELAY = 5    # 初始延迟保持不变
 # 添加指数退避的最大延迟限制
 MAX_RETRY_DELAY = 60  # 最大延迟不超过60秒
 
+# --- 响应缓存设置 ---
+# 温度不高于0.1的请求按 (模型, 温度, 提示) 缓存到 SQLite 文件，重复处理相同章节时不再调用API
+# 未设置 RESPONSE_CACHE_FILE 环境变量时不启用缓存
+RESPONSE_CACHE_FILE = os.getenv("RESPONSE_CACHE_FILE")
+RESPONSE_CACHE_TTL = None  # 缓存有效期（秒），None 表示永不过期
+# 提示词的静态前缀作为 system 消息发送，服务商可复用前缀缓存；
+# 需要显式声明缓存的服务商 (如经 OpenRouter 调用 Claude) 可设置 PROMPT_CACHE_CONTROL=true 附带 cache_control 标记
+PROMPT_CACHE_CONTROL = os.getenv("PROMPT_CACHE_CONTROL", "").lower() in ("1", "true", "yes")
+
+# --- 主动限流设置 ---
+# 按服务商配额设置后，请求前在本地排队等待，避免触发速率限制 (429)；None 表示不限流
+REQUESTS_PER_MINUTE = None  # 每分钟请求数上限
+TOKENS_PER_MINUTE = None    # 每分钟输入token数上限（按提示长度估算）
+
+# --- 熔断设置 ---
+# 同一密钥连续多次调用彻底失败（认证失败或重试用尽）后，冷却期内直接报错，不再发送请求
+CIRCUIT_THRESHOLD = 3          # 连续失败次数阈值
+CIRCUIT_COOLDOWN_SECONDS = 30  # 熔断持续时间（秒）
+
 # --- 并行设置 ---
 DEFAULT_WORKERS = 3  # 默认工作线程数
 MAX_WORKERS = 10     # 最大工作线程数
@@ -94,10 +113,15 @@ LOG_BACKUP_COUNT = 5  # 保留5个备份日志文件
 LOG_MAX_BYTES = 5 * 1024 * 1024  # 每个日志文件最大5MB
 
 # --- Helper Functions ---
+# 本进程中已确保存在的小说术语库目录，避免每次获取文件路径都重复创建目录
+_created_dirs = set()
+
 def get_novel_terminology_dir(novel_name):
     """获取指定小说的术语库目录路径"""
     path = os.path.join(TERMINOLOGY_DIR, novel_name)
-    os.makedirs(path, exist_ok=True)  # 确保目录存在
+    if path not in _created_dirs:
+        os.makedirs(path, exist_ok=True)  # 确保目录存在
+        _created_dirs.add(path)
     return path
 
 def get_novel_character_file(novel_name):
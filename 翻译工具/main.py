@@ -70,11 +70,11 @@ def _process_single_file_logic(
     """
     try:
         logging.debug(f"_process_single_file_logic: File {file_name} (Num {file_number}) - Korean len {len(korean_text)}, Terminology len {len(formatted_terminology)}")
-        # 步骤1: 构建翻译提示
-        translation_prompt = translator_prompts.build_translation_prompt(korean_text, formatted_terminology)
+        # 步骤1: 构建翻译提示（静态前缀单独发送，便于服务商复用前缀缓存）
+        translation_prefix, translation_prompt = translator_prompts.build_translation_parts(korean_text, formatted_terminology)
         
         # 步骤2: 调用API进行翻译
-        chinese_text = translator_api.translate(translation_prompt, temperature=0.1)
+        chinese_text = translator_api.translate(translation_prompt, temperature=0.1, system_prefix=translation_prefix)
         
         if not chinese_text or not isinstance(chinese_text, str) or len(chinese_text.strip()) < 10:
             logging.error(f"API返回的翻译结果无效或过短 for file {file_name}: {chinese_text[:100]}...")
@@ -86,13 +86,13 @@ def _process_single_file_logic(
         # logging.info(f"File {file_name} translated, output temporarily in memory.")
 
         # 步骤4: 构建术语更新提示
-        terminology_update_prompt = translator_prompts.build_terminology_update_prompt(
+        terminology_update_prefix, terminology_update_prompt = translator_prompts.build_terminology_update_parts(
             korean_text, chinese_text, formatted_terminology)
         
         # 步骤5: 调用API提取术语建议
         new_terms_response = None
         try:
-            new_terms_response = translator_api.extract_terms(terminology_update_prompt, temperature=0.01)
+            new_terms_response = translator_api.extract_terms(terminology_update_prompt, temperature=0.01, system_prefix=terminology_update_prefix)
         except Exception as e_term_extract:
             # Log error in term extraction, but main translation is successful
             logging.warning(f"File {file_name}: 术语提取API调用失败: {str(e_term_extract)}. 翻译仍视为成功。")
@@ -207,44 +207,56 @@ def continuous_translation(novel_name: str, start_num: Optional[int] = None,
                 max_retry_delay=config.MAX_RETRY_DELAY,
                 network_error_retries=config.NETWORK_ERROR_RETRIES,
                 parse_error_retries=config.PARSE_ERROR_RETRIES,
-                timeout_error_retries=config.TIMEOUT_ERROR_RETRIES
+                timeout_error_retries=config.TIMEOUT_ERROR_RETRIES,
+                cache_path=config.RESPONSE_CACHE_FILE,
+                cache_ttl_seconds=config.RESPONSE_CACHE_TTL,
+                prompt_cache_control=config.PROMPT_CACHE_CONTROL,
+                requests_per_minute=config.REQUESTS_PER_MINUTE,
+                tokens_per_minute=config.TOKENS_PER_MINUTE,
+                circuit_threshold=config.CIRCUIT_THRESHOLD,
+                circuit_cooldown_seconds=config.CIRCUIT_COOLDOWN_SECONDS
             )
             
             start_time_processing = time.time()
             files_processed_count = 0
             files_succeeded_count = 0
             
-            for i, file_num_to_process in enumerate(target_files):
-                logging.info("-" * 30)
-                logging.info(f"串行处理文件 {i+1}/{len(target_files)} (编号 {file_num_to_process})")
+            try:
+                for i, file_num_to_process in enumerate(target_files):
+                    logging.info("-" * 30)
+                    logging.info(f"串行处理文件 {i+1}/{len(target_files)} (编号 {file_num_to_process})")
                 
-                success, translated_content, terms_api_response = _process_single_file_logic(
-                    file_number=file_num_to_process,
-                    korean_text=korean_text_content, # Fetched before calling
-                    file_name=actual_file_name,    # Fetched before calling
-                    file_handler=file_handler,
-                    translator_api=translator_api_serial,
-                    translator_prompts=translator_prompts,
-                    formatted_terminology=terms_for_prompt # Fetched before calling
-                )
+                    success, translated_content, terms_api_response = _process_single_file_logic(
+                        file_number=file_num_to_process,
+                        korean_text=korean_text_content, # Fetched before calling
+                        file_name=actual_file_name,    # Fetched before calling
+                        file_handler=file_handler,
+                        translator_api=translator_api_serial,
+                        translator_prompts=translator_prompts,
+                        formatted_terminology=terms_for_prompt # Fetched before calling
+                    )
                 
-                files_processed_count += 1
-                if success:
-                    files_succeeded_count += 1
+                    files_processed_count += 1
+                    if success:
+                        files_succeeded_count += 1
                 
-                # 显示进度
-                elapsed = time.time() - start_time_processing
-                avg_speed = files_processed_count / elapsed if elapsed > 0 else 0
-                eta_seconds = (elapsed / files_processed_count) * (len(target_files) - files_processed_count) if files_processed_count > 0 else 0
+                    # 显示进度
+                    elapsed = time.time() - start_time_processing
+                    avg_speed = files_processed_count / elapsed if elapsed > 0 else 0
+                    eta_seconds = (elapsed / files_processed_count) * (len(target_files) - files_processed_count) if files_processed_count > 0 else 0
                 
-                logging.info(f"进度: {files_processed_count}/{len(target_files)} "
-                             f"({(files_processed_count/len(target_files))*100:.1f}%)")
-                if files_processed_count > 0 : # 避免除零
-                    logging.info(f"成功率: {files_succeeded_count}/{files_processed_count} "
-                                 f"({(files_succeeded_count/files_processed_count)*100:.1f}%)")
-                logging.info(f"耗时: {utils.format_time_seconds(elapsed)}, "
-                             f"速度: {avg_speed:.2f}个/秒, "
-                             f"预计剩余: {utils.format_time_seconds(eta_seconds) if eta_seconds > 0 else 'N/A'}")
+                    logging.info(f"进度: {files_processed_count}/{len(target_files)} "
+                                 f"({(files_processed_count/len(target_files))*100:.1f}%)")
+                    if files_processed_count > 0 : # 避免除零
+                        logging.info(f"成功率: {files_succeeded_count}/{files_processed_count} "
+                                     f"({(files_succeeded_count/files_processed_count)*100:.1f}%)")
+                    logging.info(f"耗时: {utils.format_time_seconds(elapsed)}, "
+                                 f"速度: {avg_speed:.2f}个/秒, "
+                                 f"预计剩余: {utils.format_time_seconds(eta_seconds) if eta_seconds > 0 else 'N/A'}")
+            finally:
+                # 无论循环是否因异常中断，都写入翻译过程中合并推迟的术语库改动
+                terminology_manager.flush(force=True)
+                translator_api_serial.close()
             
             total_processing_time = time.time() - start_time_processing
             logging.info("=" * 50)
@@ -8,6 +8,7 @@
 import os
 import time
 import logging
+import logging.handlers
 import threading
 import queue
 from typing import List, Dict, Any, Optional, Tuple, Set, Callable, Type
@@ -15,7 +16,7 @@ from datetime import datetime, timedelta
 import requests
 
 import config
-from translator_core import TranslatorAPI, TranslatorPrompts
+from translator_core import CircuitOpenError, TranslatorAPI, TranslatorPrompts
 from file_handler import FileHandler
 from terminology_manager import TerminologyManager
 from progress_tracker import ProgressTracker
@@ -49,6 +50,14 @@ class ApiKeyRotator:
         # 使用集合记录暂时禁用的密钥
         self.disabled_keys = set()  
         self.disabled_until = {}  # 记录密钥禁用到的时间
+        # 当前可用密钥列表，仅在禁用/恢复时增量维护，避免每次取密钥都全量扫描
+        self._available_keys = list(api_keys)
+        
+        # 错误处理相关配置只读取一次，避免在每次报告错误时重复探测 config
+        self._cfg_rate_limit_minutes = getattr(config, 'RATE_LIMIT_DISABLE_MINUTES', 5)
+        self._cfg_timeout_seconds = getattr(config, 'TIMEOUT_DISABLE_SECONDS', 30)
+        self._cfg_connection_error_seconds = getattr(config, 'CONNECTION_ERROR_DISABLE_SECONDS', 45)
+        self._cfg_max_errors = getattr(config, 'MAX_ERRORS_BEFORE_DISABLE', 5)
         
         logging.info(f"API密钥轮换器初始化成功，共加载 {len(api_keys)} 个密钥")
     
@@ -62,31 +71,26 @@ class ApiKeyRotator:
         with self.lock:
             self._check_disabled_keys()
             
-            available_keys = [k for k in self.api_keys if k not in self.disabled_keys]
-            if not available_keys:
+            if not self._available_keys:
                 logging.warning("所有API密钥当前都已禁用。正在尝试恢复...")
                 if not self.api_keys:
                     logging.error("ApiKeyRotator: API密钥列表为空，无法提供密钥。")
                     return None
-                logging.error("所有API密钥都不可用，将强制使用第一个密钥尝试。")
                 logging.error("ApiKeyRotator: 没有可用的API密钥。")
                 return None 
 
-            start_idx = self.current_index % len(self.api_keys)
-            for i in range(len(self.api_keys)):
-                check_idx = (start_idx + i) % len(self.api_keys)
-                key = self.api_keys[check_idx]
-                if key in available_keys:
-                    self.current_index = check_idx
-                    self.usage_counts[key] += 1
-                    self.last_used[key] = datetime.now()
-                    return key
-            
-            logging.error("ApiKeyRotator: 逻辑错误，未能从available_keys中选择一个密钥。")
-            return None 
+            # 在可用密钥之间轮换
+            key = self._available_keys[self.current_index % len(self._available_keys)]
+            self.current_index += 1
+            self.usage_counts[key] += 1
+            self.last_used[key] = datetime.now()
+            return key
 
     def _check_disabled_keys(self) -> None:
         """检查并恢复暂时禁用的密钥"""
+        if not self.disabled_until:
+            return
+
         now = datetime.now()
         keys_to_enable = []
         
@@ -98,6 +102,7 @@ class ApiKeyRotator:
             self.disabled_keys.remove(key)
             del self.disabled_until[key]
             self.error_counts[key] = 0
+            self._available_keys.append(key)
             logging.info(f"API密钥 {key[:8]}... 已恢复可用。")
     
     def report_error(self, key: str, error_code: Optional[int] = None, exception: Optional[Exception] = None) -> None:
@@ -128,24 +133,31 @@ class ApiKeyRotator:
                 logging.error(f"API密钥 {key[:8]}... 认证失败 (401)。将永久禁用。")
             elif error_code == 429:
                 error_type = "rate_limit"
-                disable_duration = timedelta(minutes=config.RATE_LIMIT_DISABLE_MINUTES if hasattr(config, 'RATE_LIMIT_DISABLE_MINUTES') else 5)
+                disable_duration = timedelta(minutes=self._cfg_rate_limit_minutes)
                 logging.warning(f"API密钥 {key[:8]}... 遭遇速率限制 (429)。暂时禁用 {disable_duration.total_seconds() / 60} 分钟。")
+            elif isinstance(exception, CircuitOpenError):
+                error_type = "circuit_open"
+                # 该密钥的熔断器已打开，在其恢复前直接换用其他密钥
+                disable_duration = timedelta(seconds=exception.retry_after)
+                logging.warning(f"API密钥 {key[:8]}... 处于熔断状态。暂时禁用 {disable_duration.total_seconds():.0f} 秒。")
             elif isinstance(exception, requests.exceptions.Timeout):
                 error_type = "timeout"
-                disable_duration = timedelta(seconds=config.TIMEOUT_DISABLE_SECONDS if hasattr(config, 'TIMEOUT_DISABLE_SECONDS') else 30)
+                disable_duration = timedelta(seconds=self._cfg_timeout_seconds)
                 logging.warning(f"API密钥 {key[:8]}... 请求超时。暂时禁用 {disable_duration.total_seconds()} 秒。")
             elif isinstance(exception, requests.exceptions.ConnectionError):
                 error_type = "connection_error"
-                disable_duration = timedelta(seconds=config.CONNECTION_ERROR_DISABLE_SECONDS if hasattr(config, 'CONNECTION_ERROR_DISABLE_SECONDS') else 45)
+                disable_duration = timedelta(seconds=self._cfg_connection_error_seconds)
                 logging.warning(f"API密钥 {key[:8]}... 连接错误。暂时禁用 {disable_duration.total_seconds()} 秒。")
-            elif self.error_counts[key] >= (config.MAX_ERRORS_BEFORE_DISABLE if hasattr(config, 'MAX_ERRORS_BEFORE_DISABLE') else 5):
+            elif self.error_counts[key] >= self._cfg_max_errors:
                 error_type = "too_many_errors"
                 logging.warning(f"API密钥 {key[:8]}... 连续错误次数过多 ({self.error_counts[key]}). 暂时禁用。")
             else:
                 logging.info(f"API密钥 {key[:8]}... 发生错误 (类型: {type(exception).__name__ if exception else 'N/A'}, code: {error_code}), 错误次数: {self.error_counts[key]}")
                 return
 
-            self.disabled_keys.add(key)
+            if key not in self.disabled_keys:
+                self.disabled_keys.add(key)
+                self._available_keys.remove(key)
             if not permanent_disable:
                 self.disabled_until[key] = datetime.now() + disable_duration
             else:
@@ -306,7 +318,9 @@ class ParallelTranslationCoordinator:
                  progress_tracker: ProgressTracker
                  ):
         self.novel_name = novel_name
-        self.num_workers = max(1, min(num_workers, config.MAX_WORKERS if hasattr(config, 'MAX_WORKERS') else 10))
+        self._cfg_max_workers = getattr(config, 'MAX_WORKERS', 10)
+        self._cfg_api_timeout = config.API_TIMEOUT
+        self.num_workers = max(1, min(num_workers, self._cfg_max_workers))
         self.logger = logging.getLogger(__name__ + ".Coordinator")
         
         self.process_single_file_logic_ref = process_single_file_logic_ref
@@ -331,6 +345,11 @@ class ParallelTranslationCoordinator:
         self.threads = []
         self.stop_event = threading.Event()
         self.parallel_progress_tracker: Optional[ParallelProgressTracker] = None
+        
+        # 日志队列只在 run_parallel_translation 运行期间启用，见 _start_log_queue
+        self._original_log_handlers: List[logging.Handler] = []
+        self._log_listener: Optional[logging.handlers.QueueListener] = None
+        
         self.logger.info(f"并行翻译协调器初始化: {self.num_workers} 工作线程 for novel '{self.novel_name}'")
     
     def schedule_translations(self, start_num: int, count: int, force: bool = False) -> None:
@@ -360,6 +379,7 @@ class ParallelTranslationCoordinator:
         返回:
             是否成功处理了至少一个文件
         """
+        self._start_log_queue()
         try:
             self.parallel_progress_tracker = ParallelProgressTracker(len(target_files), self.novel_name)
             
@@ -374,7 +394,7 @@ class ParallelTranslationCoordinator:
             log_interval = 30
             last_log_time = start_time
             
-            max_wait_time = len(target_files) * config.API_TIMEOUT * 1.5
+            max_wait_time = len(target_files) * self._cfg_api_timeout * 1.5
             timeout_flag = not self.wait_completion(timeout=max_wait_time)
             
             if timeout_flag:
@@ -408,6 +428,8 @@ class ParallelTranslationCoordinator:
             except:
                 pass
             return False
+        finally:
+            self._stop_log_queue()
     
     def start(self) -> None:
         """启动工作线程"""
@@ -440,7 +462,11 @@ class ParallelTranslationCoordinator:
         try:
             while not self.stop_event.is_set():
                 try:
-                    file_num, force = self.task_queue.get(timeout=1)
+                    try:
+                        file_num, force = self.task_queue.get(timeout=1)
+                    except queue.Empty:
+                        # 队列暂时为空不是错误，也不能调用 task_done()，否则 join() 计数会失衡
+                        continue
                     
                     self.parallel_progress_tracker.file_started(file_num)
                     logging.info(f"工作线程 {worker_id+1} 开始处理文件 {file_num}")
@@ -480,127 +506,74 @@ class ParallelTranslationCoordinator:
         返回:
             是否所有任务都已完成
         """
-        start_time = time.time()
-        log_interval = 30
-        last_log_time = start_time
+        # task_queue.join() 在 task_done() 与 put() 数量平衡时立即返回，
+        # 由辅助线程等待它，主线程只需等待事件，无需轮询
+        all_done = threading.Event()
         
-        while not self.task_queue.empty() or any(w.is_alive() for w in self.threads):
-            if timeout and time.time() - start_time > timeout:
-                logging.warning(f"等待完成超时 ({timeout}秒)")
-                return False
-            
-            current_time = time.time()
-            if current_time - last_log_time >= log_interval:
-                self.parallel_progress_tracker.log_progress()
-                last_log_time = current_time
-            # 如果目标文件已存在且不强制重新翻译，则跳过
-            if not force and self.file_handler.check_output_exists(file_num):
-                logging.info(f"文件 {file_num} 已翻译，跳过")
-                return True
-            
-            # 构建翻译提示
-            with self.terminology_lock:  # 获取读锁
-                terminology = self.terminology_manager.get_formatted_terminology()
-                
-                # 初始化 PromptBuilder
-                prompt_builder = PromptBuilder()
-                
-                # 构建翻译提示
-                prompt = prompt_builder.build_translation_prompt(source_content, terminology)
-            
-            # 调用API翻译
-            try:
-                translation = api_client.translate_text(prompt)
-                if not translation:
-                    raise ValueError("翻译结果为空")
-            except Exception as e:
-                error_type = 'timeout' if 'timeout' in str(e).lower() else 'other'
-                if 'rate' in str(e).lower() and 'limit' in str(e).lower():
-                    error_type = 'rate_limit'
-                elif 'auth' in str(e).lower() or 'key' in str(e).lower() and 'invalid' in str(e).lower():
-                    error_type = 'auth'
-                
-                # 报告API密钥错误
-                self.key_rotator.report_error(api_client.api_key, error_type)
-                raise
-            
-            # 保存翻译结果
-            self.file_handler.write_output_file(translation, file_num)
-            
-            # 更新术语库
-            try:
-                # 步骤1: 构建术语更新提示
-                terminology = self.terminology_manager.get_formatted_terminology()
-                
-                # 初始化 PromptBuilder
-                prompt_builder = PromptBuilder()
-                
-                # 构建术语更新提示
-                terminology_prompt = prompt_builder.build_terminology_update_prompt(
-                    source_content, translation, terminology)
-                
-                # 步骤2: 调用API更新术语库
-                new_terms = api_client.update_terminology(terminology_prompt)
-                
-                # 步骤3: 更新术语库
-                if new_terms and isinstance(new_terms, str):
-                    char_added, noun_added, expr_added = self.terminology_manager.update_terminology_from_api_response(new_terms)
-                    logging.info(f"文件 {file_num} 术语库更新: {char_added}人物, {noun_added}专有名词, {expr_added}文化表达")
-            except Exception as e:
-                logging.warning(f"更新术语库时发生错误: {str(e)}")
-            
-            return True
+        def _join_task_queue():
+            self.task_queue.join()
+            all_done.set()
         
-        except Exception as e:
-            logging.error(f"处理文件 {file_num} 时发生错误: {str(e)}")
-            return False
-    
-    def wait_completion(self, timeout: Optional[float] = None) -> bool:
-        """
-        等待所有任务完成
+        threading.Thread(target=_join_task_queue, name="TaskQueueJoiner", daemon=True).start()
         
-        参数:
-            timeout: 最大等待时间（秒）
-            
-        返回:
-            是否所有任务都已完成
-        """
-        start_time = time.time()
         log_interval = 30  # 每30秒记录一次进度
-        last_log_time = start_time
+        deadline = time.time() + timeout if timeout else None
         
-        while not self.task_queue.empty() or any(w.is_alive() for w in self.workers):
+        while True:
+            wait_time = log_interval
+            if deadline is not None:
+                wait_time = min(wait_time, max(deadline - time.time(), 0))
+            
+            if all_done.wait(wait_time):
+                break
+            
             # 检查超时
-            if timeout and time.time() - start_time > timeout:
+            if deadline is not None and time.time() >= deadline:
                 logging.warning(f"等待完成超时 ({timeout}秒)")
                 return False
             
             # 定期记录进度
-            current_time = time.time()
-            if current_time - last_log_time >= log_interval:
-                self.progress_tracker.log_progress()
-                last_log_time = current_time
-            
-            # 小睡片刻
-            time.sleep(1)
+            self.parallel_progress_tracker.log_progress()
         
         # 最终进度
-        self.progress_tracker.log_progress()
-        
-        # 记录API密钥使用情况
-        key_status = self.key_rotator.get_status()
-        logging.info(f"API密钥使用情况: 共{key_status['total_keys']}个密钥, "
-                    f"活跃{key_status['active_keys']}个, 禁用{key_status['disabled_keys']}个")
-        
+        self.parallel_progress_tracker.log_progress()
         return True
     
     def stop(self) -> None:
         """停止所有翻译任务"""
         logging.info("正在停止并行翻译...")
-        self.should_terminate.set()
+        self.stop_event.set()
         
         # 等待所有工作线程结束
-        for worker in self.workers:
+        for worker in self.threads:
             worker.join(2)  # 最多等待2秒
         
-        logging.info("并行翻译已停止") 
\ No newline at end of file
+        logging.info("并行翻译已停止")
+
+        # 工作线程共享的术语管理器中可能还有推迟写入的改动
+        if self.terminology_manager is not None:
+            self.terminology_manager.flush(force=True)
+    
+    def _start_log_queue(self) -> None:
+        """
+        工作线程只把日志记录放入队列，由单独的监听线程统一格式化和写入，
+        避免多个线程争用各个 handler 的锁。包装的是此时根日志器上已有的处理器
+        """
+        if self._log_listener is not None:
+            return
+        root_logger = logging.getLogger()
+        self._original_log_handlers = root_logger.handlers[:]
+        log_queue = queue.Queue(-1)
+        root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue, *self._original_log_handlers, respect_handler_level=True
+        )
+        self._log_listener.start()
+    
+    def _stop_log_queue(self) -> None:
+        """停止日志监听线程（会先写出队列中剩余的记录），并恢复原有的日志处理器"""
+        if self._log_listener is None:
+            return
+        self._log_listener.stop()
+        self._log_listener = None
+        logging.getLogger().handlers = self._original_log_handlers 
\ No newline at end of file
@@ -6,6 +6,11 @@ from typing import Dict, List, Optional, Set
 
 import config
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库 json
+    orjson = None
+
 class ProgressTracker:
     """负责跟踪翻译进度，支持断点续译"""
     
@@ -75,9 +80,17 @@ class ProgressTracker:
             # 确保目录存在
             os.makedirs(os.path.dirname(self.progress_file), exist_ok=True)
             
-            # 写入进度文件
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            # 一次性序列化为 UTF-8 字节
+            if orjson is not None:
+                payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                payload = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+            
+            # 先写临时文件再原子替换，避免中断时留下损坏的进度文件
+            tmp_file = self.progress_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_file, self.progress_file)
                 
             logging.debug(f"进度已保存: {len(self.completed_files)} 个已完成文件")
         except Exception as e:
@@ -1,11 +1,67 @@
 import os
+import re
 import json
 import logging
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 
 import config
 from terminology_manager import TerminologyManager
 
+logger = logging.getLogger(__name__)
+
+# 模板占位符，构建提示时一次扫描完成全部替换
+_PLACEHOLDER_RE = re.compile(r"\{(korean_text|chinese_text|terminology)\}")
+
+# 术语库各分类的格式化规则: (分类键, 原文字段, 译文字段, 标题)
+_TERMINOLOGY_SECTIONS = (
+    ("characters", "korean_name", "chinese_name", "### 人物"),
+    ("proper_nouns", "korean_term", "chinese_term", "### 专有名词"),
+    ("cultural_expressions", "korean_expression", "chinese_expression", "### 文化表达"),
+)
+
+
+def _format_terminology_row(korean: str, chinese: str, desc: str) -> str:
+    """格式化单条术语"""
+    return f"- {korean} → {chinese} ({desc})" if desc else f"- {korean} → {chinese}"
+
+
+def _iter_terminology_lines(terminology: Dict[str, List[Dict[str, Any]]]):
+    """逐行生成术语库的格式化文本"""
+    for section_key, korean_field, chinese_field, header in _TERMINOLOGY_SECTIONS:
+        entries = terminology.get(section_key)
+        if not entries:
+            continue
+        yield header
+        for entry in entries:
+            korean = entry.get(korean_field, "")
+            chinese = entry.get(chinese_field, "")
+            if korean and chinese:
+                yield _format_terminology_row(korean, chinese, entry.get("description", ""))
+        yield ""
+
+
+def _compile_template(template: str) -> Tuple[List[str], List[str]]:
+    """
+    将模板预先拆分为字面量片段和占位符名称
+    
+    参数:
+        template: 提示模板
+        
+    返回:
+        (literals, holes)，其中 literals 比 holes 多一个元素，二者交替拼接即为原模板
+    """
+    parts = _PLACEHOLDER_RE.split(template)
+    return parts[0::2], parts[1::2]
+
+
+@lru_cache(maxsize=16)
+def _load_template(prompt_file: str, mtime: float) -> str:
+    """按 (路径, 修改时间) 缓存模板内容，模板文件被修改后会自动重新读取"""
+    with open(prompt_file, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
 class PromptBuilder:
     """负责构建发送给API的提示，包括加载提示模板、注入术语等"""
     
@@ -14,7 +70,11 @@ class PromptBuilder:
         self.translate_prompt_template = self._load_prompt_template(config.TRANSLATE_PROMPT_FILE)
         self.update_prompt_template = self._load_prompt_template(config.UPDATE_PROMPT_FILE)
         
-        logging.info("提示构建器初始化完成")
+        # 模板结构固定，加载时拆分一次，构建提示时只需拼接
+        self._translate_compiled = _compile_template(self.translate_prompt_template)
+        self._update_compiled = _compile_template(self.update_prompt_template)
+        
+        logger.info("提示构建器初始化完成")
         
     def _load_prompt_template(self, prompt_file: str) -> str:
         """
@@ -29,19 +89,40 @@ class PromptBuilder:
         try:
             if not os.path.exists(prompt_file):
                 error_msg = f"提示模板文件不存在: {prompt_file}"
-                logging.error(error_msg)
+                logger.error(error_msg)
                 raise FileNotFoundError(error_msg)
                 
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = _load_template(prompt_file, os.path.getmtime(prompt_file))
                 
-            logging.info(f"成功加载提示模板: {os.path.basename(prompt_file)}, 长度: {len(content)} 字符")
+            logger.info("成功加载提示模板: %s, 长度: %d 字符", os.path.basename(prompt_file), len(content))
             return content
             
         except Exception as e:
-            logging.error(f"加载提示模板时出错: {str(e)}")
+            logger.error("加载提示模板时出错: %s", e)
             raise
     
+    @staticmethod
+    def _render(compiled: Tuple[List[str], List[str]], values: Dict[str, str]) -> str:
+        """
+        将预拆分的模板与替换值拼接为最终提示
+        
+        参数:
+            compiled: _compile_template 返回的 (literals, holes)
+            values: 占位符名称到替换值的映射，未提供的占位符保持原样
+            
+        返回:
+            替换后的字符串
+        """
+        literals, holes = compiled
+        if not holes:
+            return literals[0]
+        
+        parts = [literals[0]]
+        for hole, literal in zip(holes, literals[1:]):
+            parts.append(values.get(hole, "{" + hole + "}"))
+            parts.append(literal)
+        return "".join(parts)
+    
     def format_terminology(self, terminology: Dict[str, List[Dict[str, Any]]]) -> str:
         """
         格式化术语库为文本形式
@@ -52,42 +133,7 @@ class PromptBuilder:
         返回:
             术语库的格式化文本表示
         """
-        lines = []
-        
-        # 添加人物术语
-        if terminology.get("characters"):
-            lines.append("### 人物")
-            for char in terminology["characters"]:
-                korean = char.get("korean_name", "")
-                chinese = char.get("chinese_name", "")
-                desc = char.get("description", "")
-                if korean and chinese:
-                    lines.append(f"- {korean} → {chinese}" + (f" ({desc})" if desc else ""))
-            lines.append("")
-        
-        # 添加专有名词
-        if terminology.get("proper_nouns"):
-            lines.append("### 专有名词")
-            for noun in terminology["proper_nouns"]:
-                korean = noun.get("korean_term", "")
-                chinese = noun.get("chinese_term", "")
-                desc = noun.get("description", "")
-                if korean and chinese:
-                    lines.append(f"- {korean} → {chinese}" + (f" ({desc})" if desc else ""))
-            lines.append("")
-        
-        # 添加文化表达
-        if terminology.get("cultural_expressions"):
-            lines.append("### 文化表达")
-            for expr in terminology["cultural_expressions"]:
-                korean = expr.get("korean_expression", "")
-                chinese = expr.get("chinese_expression", "")
-                desc = expr.get("description", "")
-                if korean and chinese:
-                    lines.append(f"- {korean} → {chinese}" + (f" ({desc})" if desc else ""))
-            lines.append("")
-        
-        return "\n".join(lines)
+        return "\n".join(_iter_terminology_lines(terminology))
     
     def build_translation_prompt(self, korean_text: str, terminology: str) -> str:
         """
@@ -101,11 +147,12 @@ class PromptBuilder:
             完整的翻译提示字符串
         """
         # 使用模板中的变量替换
-        final_prompt = self.translate_prompt_template
-        final_prompt = final_prompt.replace("{terminology}", terminology)
-        final_prompt = final_prompt.replace("{korean_text}", korean_text)
+        final_prompt = self._render(self._translate_compiled, {
+            "terminology": terminology,
+            "korean_text": korean_text,
+        })
         
-        logging.debug(f"构建完成翻译提示，总长度: {len(final_prompt)} 字符")
+        logger.debug("构建完成翻译提示，总长度: %d 字符", len(final_prompt))
         return final_prompt
         
     def build_terminology_update_prompt(self, korean_text: str, chinese_text: str, terminology: str) -> str:
@@ -121,10 +168,11 @@ class PromptBuilder:
             完整的术语更新提示字符串
         """
         # 使用模板中的变量替换
-        final_prompt = self.update_prompt_template
-        final_prompt = final_prompt.replace("{terminology}", terminology)
-        final_prompt = final_prompt.replace("{korean_text}", korean_text)
-        final_prompt = final_prompt.replace("{chinese_text}", chinese_text)
+        final_prompt = self._render(self._update_compiled, {
+            "terminology": terminology,
+            "korean_text": korean_text,
+            "chinese_text": chinese_text,
+        })
         
-        logging.debug(f"构建完成术语更新提示，总长度: {len(final_prompt)} 字符")
+        logger.debug("构建完成术语更新提示，总长度: %d 字符", len(final_prompt))
         return final_prompt 
\ No newline at end of file
@@ -1,25 +1,70 @@
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库 json
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson 为可选依赖，未安装时整体读入文件
+    ijson = None
+
+def _dump_item(item):
+    """将单个条目序列化为数组元素，缩进与整体 indent=2 输出一致"""
+    if orjson is not None:
+        payload = orjson.dumps(item, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(item, ensure_ascii=False, indent=2).encode('utf-8')
+    return b"\n".join(b"  " + line for line in payload.split(b"\n"))
+
+def _check_top_level_array(f):
+    """
+    确认文件的顶层是JSON数组，检查后回到文件开头。
+    ijson 对顶层不是数组的文件不产生任何条目也不报错，不先检查的话原文件会被替换成空数组
+    """
+    head = f.read(64).lstrip(b" \t\r\n")
+    while not head:
+        chunk = f.read(64)
+        if not chunk:
+            break
+        head = chunk.lstrip(b" \t\r\n")
+    if not head.startswith(b"["):
+        raise ValueError("文件顶层不是JSON数组，保持原文件不变")
+    f.seek(0)
+
+def _iter_items(f):
+    """逐个读取JSON数组中的条目；安装了 ijson 时流式解析，内存占用只有单个条目"""
+    if ijson is not None:
+        _check_top_level_array(f)
+        yield from ijson.items(f, 'item', use_float=True)
+        return
+    raw = f.read()
+    yield from (orjson.loads(raw) if orjson is not None else json.loads(raw))
 
 def remove_last_updated_field(file_path):
     """从JSON文件中移除所有的last_updated字段"""
+    tmp_path = file_path + ".tmp"
     try:
-        # 读取JSON文件
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 移除每个项目中的last_updated字段
-        for item in data:
-            if 'last_updated' in item:
-                del item['last_updated']
-        
-        # 写回文件
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 逐条移除last_updated字段并写入临时文件，完成后再原子替换原文件
+        with open(file_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            dst.write(b"[")
+            count = 0
+            for item in _iter_items(src):
+                item.pop('last_updated', None)
+                dst.write(b",\n" if count else b"\n")
+                dst.write(_dump_item(item))
+                count += 1
+            dst.write(b"\n]" if count else b"]")
+        os.replace(tmp_path, file_path)
         
         print(f"成功处理文件: {file_path}")
         return True
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
         print(f"处理文件 {file_path} 时出错: {str(e)}")
         return False
 
@@ -34,11 +79,10 @@ def main():
         os.path.join(base_dir, "proper_nouns.json")
     ]
     
-    # 处理每个文件
-    success_count = 0
-    for file_path in files:
-        if remove_last_updated_field(file_path):
-            success_count += 1
+    # 各文件互不相关，使用多进程并行处理
+    with ProcessPoolExecutor(max_workers=min(len(files), os.cpu_count() or 1)) as executor:
+        results = list(executor.map(remove_last_updated_field, files))
+    success_count = sum(results)
     
     print(f"处理完成，成功处理 {success_count}/{len(files)} 个文件")
 
@@ -1,14 +1,28 @@
+import asyncio
+import hashlib
 import json
 import logging
 import time
 import requests
+from requests.adapters import HTTPAdapter
 import re
 import random
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 import argparse
 import os
 import sys
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库 json
+    orjson = None
+
+try:
+    import httpx
+except ImportError:  # httpx 为可选依赖，仅并发批量翻译需要
+    httpx = None
+
 # 默认配置 (可以根据需要修改或通过参数传入)
 DEFAULT_API_URL = "YOUR_API_URL_HERE" # 例如 "https://api.openai.com/v1/chat/completions"
 DEFAULT_MODEL_NAME = "YOUR_MODEL_NAME_HERE" # 例如 "gpt-3.5-turbo"
@@ -17,6 +31,8 @@ DEFAULT_MAX_RETRIES = 3
 DEFAULT_RETRY_DELAY = 5  # seconds
 DEFAULT_MAX_RETRY_DELAY = 60 # seconds
 DEFAULT_TEMPERATURE = 0.1
+DEFAULT_RESPONSE_CACHE_SIZE = 1024 # 进程内响应缓存的最大条目数
+CACHEABLE_MAX_TEMPERATURE = 0.1 # 只缓存温度不高于此值的请求，高温度输出本身是随机的，不应复用（与 translator_core 一致）
 
 DEFAULT_TRANSLATE_PROMPT_TEMPLATE = """
 请将以下韩文文本翻译成流畅、自然的简体中文。
@@ -34,12 +50,58 @@ DEFAULT_TRANSLATE_PROMPT_TEMPLATE = """
 请直接输出翻译后的中文文本，不要包含任何额外解释或标签。
 """
 
+# 拆分为稳定前缀 (system) 与变化部分 (user) 的模板，便于服务商缓存前缀
+# 同一批次中指令和术语库保持不变，只有待翻译文本变化
+DEFAULT_TRANSLATE_SYSTEM_TEMPLATE = """
+请将用户提供的韩文文本翻译成流畅、自然的简体中文。
+
+{custom_instructions}
+
+[术语库开始]
+{terminology}
+[术语库结束]
+
+请直接输出翻译后的中文文本，不要包含任何额外解释或标签。
+"""
+
+DEFAULT_TRANSLATE_USER_TEMPLATE = """[待翻译文本开始]
+{korean_text}
+[待翻译文本结束]"""
+
+# 已验证支持显式 cache_control 标记的服务商；其他服务商 (如 OpenAI) 依赖自动前缀缓存，不发送标记
+_CACHE_CONTROL_VENDORS = {"anthropic"}
+
+def _json_dumps(obj: Any) -> bytes:
+    """将对象序列化为 UTF-8 编码的 JSON 字节串"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def _json_loads(raw: bytes) -> Any:
+    """解析 JSON 字节串"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+# 预先计算的指数退避表：第 n 次重试取第 n-1 项，最后一项已达到上限
+_BACKOFF = tuple(
+    min(DEFAULT_RETRY_DELAY * (1 << i), DEFAULT_MAX_RETRY_DELAY)
+    for i in range(DEFAULT_MAX_RETRY_DELAY.bit_length() + 1)
+)
+
+# AI思考过程标签，只编译一次
+_THINK_RE = re.compile(r'<think>.*?</think>', re.DOTALL)
+
+# 模板占位符，构建提示时一次扫描完成全部替换
+_PLACEHOLDER_RE = re.compile(r"\{(korean_text|terminology|custom_instructions)\}")
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 class SimplifiedApiClient:
     """简化的API客户端，用于文本翻译"""
 
-    def __init__(self, api_key: str, api_url: str = DEFAULT_API_URL, model_name: str = DEFAULT_MODEL_NAME):
+    def __init__(self, api_key: str, api_url: str = DEFAULT_API_URL, model_name: str = DEFAULT_MODEL_NAME, vendor: Optional[str] = None):
         if not api_key:
             raise ValueError("API密钥不能为空")
         if not api_url:
@@ -50,18 +112,159 @@ class SimplifiedApiClient:
         self.api_key = api_key
         self.api_url = api_url
         self.model = model_name
+        self.vendor = vendor.lower() if vendor else None
+        
+        # 请求头只构建一次，同步会话与异步批量客户端共用，仅在更换密钥时更新
+        self._headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        self._masked_key = self.api_key[:8] + "..." + self.api_key[-4:]
+        
+        # 复用连接（keep-alive），避免每次请求都重新进行 TCP/TLS 握手
+        self._session = requests.Session()
+        self._session.headers.update(self._headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        
+        # 完全相同的请求 (提示、模型、温度) 直接返回缓存结果，按最近使用淘汰
+        self._response_cache: "OrderedDict[str, str]" = OrderedDict()
         
-        masked_key = self.api_key[:8] + "..." + self.api_key[-4:]
-        logging.info(f"初始化简易API客户端, API URL: {self.api_url}, 模型: {self.model}, API密钥: {masked_key}")
+        # 异步批量翻译时，遇到速率限制 (429) 后所有任务共享的冷却截止时间
+        self._rate_limit_until = 0.0
+        
+        # 每个客户端独立的随机数生成器，用于重试等待时间的抖动
+        self._rng = random.Random()
+        
+        logger.info("初始化简易API客户端, API URL: %s, 模型: %s, API密钥: %s", self.api_url, self.model, self._masked_key)
+
+    def set_api_key(self, api_key: str) -> None:
+        """
+        更换API密钥，同步更新缓存的请求头和会话请求头。
+
+        参数:
+            api_key: 新的API密钥。
+        """
+        if not api_key:
+            raise ValueError("API密钥不能为空")
+        self.api_key = api_key
+        self._headers["Authorization"] = f"Bearer {api_key}"
+        self._session.headers["Authorization"] = self._headers["Authorization"]
+        self._masked_key = api_key[:8] + "..." + api_key[-4:]
+        logger.info("已更换API密钥: %s", self._masked_key)
 
     def _remove_thinking(self, text: str) -> str:
         """移除AI思考过程，也就是<think>...</think>标签之间的内容"""
-        cleaned_text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL).strip()
+        if '<think>' not in text:  # 常见情况：没有思考内容，无需启动正则引擎
+            return text.strip()
+        cleaned_text = _THINK_RE.sub('', text).strip()
         if cleaned_text != text:
-            logging.debug(f"已移除思考内容，原长度: {len(text)}，新长度: {len(cleaned_text)}")
+            logger.debug("已移除思考内容，原长度: %d，新长度: %d", len(text), len(cleaned_text))
         return cleaned_text
 
-    def translate_text(self, prompt: str, temperature: float = DEFAULT_TEMPERATURE, max_retries: int = DEFAULT_MAX_RETRIES) -> Optional[str]:
+    @staticmethod
+    def _retry_after_seconds(headers) -> Optional[float]:
+        """解析 Retry-After 响应头（秒数形式），缺失或无法解析时返回None"""
+        value = headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_response_body(response) -> Dict[str, Any]:
+        """
+        校验响应类型后解析JSON响应体。
+
+        空响应体或HTML错误页直接判定无效，省去一次注定失败的JSON解析。
+
+        参数:
+            response: requests 或 httpx 的响应对象。
+
+        返回:
+            解析后的响应字典。
+        """
+        content_type = response.headers.get("content-type", "")
+        if "json" not in content_type:
+            raise ValueError(f"非JSON响应: {content_type or '未知类型'}")
+        content = response.content
+        if not content:
+            raise ValueError("API返回空响应体")
+        return _json_loads(content)
+
+    def _extract_response_text(self, result: Dict[str, Any]) -> str:
+        """从API响应数据中提取文本并移除思考内容，内容为空时抛出 ValueError"""
+        # 按出现频率依次尝试各个字段路径，成功路径上不做多余的存在性检查
+        response_text = None
+        try:
+            response_text = result["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            try:
+                response_text = result["choices"][0]["text"] # 兼容一些旧的API格式
+            except (KeyError, IndexError, TypeError):
+                pass
+        
+        if not response_text: # 如果上述路径没有取到，尝试直接从 result 的 "content" (某些模型可能直接返回)
+            content = result.get("content")
+            if isinstance(content, str):
+                response_text = content
+        
+        if not response_text and not result.get("choices"): # 如果还没有，并且没有choices
+             # 对于没有明确 "content" 或 "text" 字段的，并且没有 choices 的，将整个结果转为字符串
+             # 这是一种兼容性措施，但可能需要后续处理
+            logger.warning("API响应中没有找到明确的文本字段 ('content'或'text'在choices中)，将尝试使用整个响应的字符串形式。")
+            response_text = str(result)
+
+        if not response_text or len(response_text.strip()) < 1: # 检查响应是否为空
+            raise ValueError(f"API返回内容为空或无效: '{response_text}'")
+        
+        return self._remove_thinking(response_text)
+
+    def _build_messages(self, prompt: str, system_prompt: Optional[str]) -> List[Dict[str, Any]]:
+        """构建请求消息；提供 system_prompt 时将其作为可缓存的稳定前缀单独发送"""
+        if not system_prompt:
+            return [{"role": "user", "content": prompt}]
+        
+        if self.vendor in _CACHE_CONTROL_VENDORS:
+            system_content = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+        else:
+            system_content = system_prompt
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _cache_key(self, prompt: str, temperature: float, system_prompt: Optional[str]) -> str:
+        """根据请求内容生成响应缓存的键"""
+        digest = hashlib.blake2b(digest_size=16)
+        if system_prompt:
+            digest.update(system_prompt.encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(prompt.encode('utf-8'))
+        return f"{digest.hexdigest()}|{self.model}|{temperature}"
+
+    def _get_cached_response(self, key: str) -> Optional[str]:
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            self._response_cache.move_to_end(key)
+            logger.info("命中响应缓存，响应长度: %d字符", len(cached))
+        return cached
+
+    def _store_cached_response(self, key: str, text: str) -> None:
+        self._response_cache[key] = text
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > DEFAULT_RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+
+    def _retry_delay(self, retry_count: int) -> float:
+        """计算第 retry_count 次重试前的等待时间（带随机抖动的指数退避）"""
+        base = _BACKOFF[min(retry_count, len(_BACKOFF)) - 1]
+        return min(base * (1.0 + self._rng.random() * 0.2), DEFAULT_MAX_RETRY_DELAY)
+
+    def translate_text(self, prompt: str, temperature: float = DEFAULT_TEMPERATURE, max_retries: int = DEFAULT_MAX_RETRIES, system_prompt: Optional[str] = None, use_cache: bool = True) -> Optional[str]:
         """
         使用提供的提示进行文本翻译。
 
@@ -69,86 +272,165 @@ class SimplifiedApiClient:
             prompt: 发送给API的完整提示。
             temperature: 控制生成文本的随机性。
             max_retries: 最大重试次数。
+            system_prompt: (可选) 跨请求保持不变的前缀 (指令、术语库)，单独作为 system 消息发送以便服务商缓存。
+            use_cache: 是否使用进程内响应缓存；相同请求再次调用时直接返回上次的成功结果。
+                       温度高于 CACHEABLE_MAX_TEMPERATURE 的请求不缓存。
 
         返回:
             翻译后的文本，如果失败则返回None。
         """
+        cache_key = None
+        if use_cache and temperature <= CACHEABLE_MAX_TEMPERATURE:
+            cache_key = self._cache_key(prompt, temperature, system_prompt)
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                return cached
+        
         retry_count = 0
         last_error = None
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
         data = {
             "model": self.model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
+            "messages": self._build_messages(prompt, system_prompt),
             "temperature": temperature
         }
+        # 请求体只序列化一次，重试时直接复用
+        body = _json_dumps(data)
         
         while retry_count <= max_retries:
+            retry_after = None
             try:
                 if retry_count > 0:
-                    logging.info(f"API调用重试 ({retry_count}/{max_retries})...")
+                    logger.info("API调用重试 (%d/%d)...", retry_count, max_retries)
                 
-                logging.debug(f"API请求数据: {json.dumps(data, ensure_ascii=False)[:500]}...")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("API请求数据: %s...", body.decode('utf-8')[:500])
                 request_start_time = time.time()
                 
-                response = requests.post(
+                response = self._session.post(
                     self.api_url,
-                    headers=headers,
-                    json=data,
+                    data=body,
                     timeout=DEFAULT_API_TIMEOUT
                 )
                 request_duration = time.time() - request_start_time
-                logging.info(f"API响应时间: {request_duration:.2f}秒")
+                logger.info("API响应时间: %.2f秒", request_duration)
                 
                 response.raise_for_status()  # 抛出HTTP错误
-                result = response.json()
-                logging.debug(f"API响应原始数据: {json.dumps(result, ensure_ascii=False)[:500]}...")
+                result = self._parse_response_body(response)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("API响应原始数据: %s...", response.content.decode('utf-8', errors='replace')[:500])
                 
-                response_text = None
-                if "choices" in result and len(result["choices"]) > 0:
-                    choice = result["choices"][0]
-                    if "message" in choice and "content" in choice["message"]:
-                        response_text = choice["message"]["content"]
-                    elif "text" in choice: # 兼容一些旧的API格式
-                        response_text = choice["text"]
+                cleaned_text = self._extract_response_text(result)
                 
-                if not response_text: # 如果上述路径没有取到，尝试直接从 result 的 "content" (某些模型可能直接返回)
-                    if "content" in result and isinstance(result["content"], str) :
-                         response_text = result["content"]
+                logger.info("API调用成功，响应长度: %d字符", len(cleaned_text))
+                if cache_key is not None:
+                    self._store_cached_response(cache_key, cleaned_text)
+                return cleaned_text
                 
-                if not response_text and not ( "choices" in result and len(result["choices"]) > 0 ): # 如果还没有，并且没有choices
-                     # 对于没有明确 "content" 或 "text" 字段的，并且没有 choices 的，将整个结果转为字符串
-                     # 这是一种兼容性措施，但可能需要后续处理
-                    logging.warning("API响应中没有找到明确的文本字段 ('content'或'text'在choices中)，将尝试使用整个响应的字符串形式。")
-                    response_text = str(result)
+            except requests.exceptions.HTTPError as e:
+                last_error = f"请求异常: {str(e)}"
+                status = e.response.status_code if e.response is not None else None
+                if status == 401:
+                    logger.error("API认证失败 (401 Unauthorized)。请检查您的API密钥。")
+                    return None # 认证错误不应重试
+                if status == 429:
+                    logger.warning("API速率限制。请稍后重试。")
+                    retry_after = self._retry_after_seconds(e.response.headers)
+            except requests.exceptions.Timeout as e:
+                last_error = f"请求超时: {str(e)}"
+            except requests.exceptions.ConnectionError as e:
+                last_error = f"连接错误: {str(e)}"
+            except requests.exceptions.RequestException as e:
+                last_error = f"请求异常: {str(e)}"
+            except (ValueError, json.JSONDecodeError) as e: # 包括API返回内容为空的ValueError
+                last_error = f"响应解析错误或内容无效: {str(e)}"
+            except Exception as e:
+                last_error = f"未知错误: {str(e)}"
 
+            retry_count += 1
+            if retry_count <= max_retries:
+                # 服务器通过 Retry-After 给出了等待时间时以其为准
+                sleep_time = retry_after if retry_after is not None else self._retry_delay(retry_count)
+                logger.warning("API调用失败 (%d/%d): %s", retry_count - 1, max_retries, last_error)
+                logger.info("等待 %.1f 秒后重试...", sleep_time)
+                time.sleep(sleep_time)
+            else:
+                logger.error("已达到最大重试次数 (%d)，放弃API调用。最后错误: %s", max_retries, last_error)
+                break
+        
+        return None
+
+    async def translate_text_async(self, client: "httpx.AsyncClient", prompt: str, temperature: float = DEFAULT_TEMPERATURE, max_retries: int = DEFAULT_MAX_RETRIES, system_prompt: Optional[str] = None, use_cache: bool = True) -> Optional[str]:
+        """
+        translate_text 的异步版本，使用调用方提供的 httpx.AsyncClient 发送请求。
+
+        参数:
+            client: 共享的 httpx.AsyncClient。
+            prompt: 发送给API的完整提示。
+            temperature: 控制生成文本的随机性。
+            max_retries: 最大重试次数。
+            system_prompt: (可选) 同 translate_text。
+            use_cache: 同 translate_text。
 
-                if not response_text or len(response_text.strip()) < 1: # 检查响应是否为空
-                    raise ValueError(f"API返回内容为空或无效: '{response_text}'")
+        返回:
+            翻译后的文本，如果失败则返回None。
+        """
+        cache_key = None
+        if use_cache and temperature <= CACHEABLE_MAX_TEMPERATURE:
+            cache_key = self._cache_key(prompt, temperature, system_prompt)
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                return cached
+        
+        retry_count = 0
+        last_error = None
+        
+        data = {
+            "model": self.model,
+            "messages": self._build_messages(prompt, system_prompt),
+            "temperature": temperature
+        }
+        body = _json_dumps(data)
+        
+        while retry_count <= max_retries:
+            # 其他任务遇到速率限制时，所有任务一起等待冷却结束
+            cooldown = self._rate_limit_until - time.monotonic()
+            if cooldown > 0:
+                await asyncio.sleep(cooldown)
+            
+            try:
+                if retry_count > 0:
+                    logger.info("API调用重试 (%d/%d)...", retry_count, max_retries)
+                
+                request_start_time = time.time()
+                response = await client.post(self.api_url, content=body)
+                request_duration = time.time() - request_start_time
+                logger.info("API响应时间: %.2f秒", request_duration)
                 
-                cleaned_text = self._remove_thinking(response_text)
+                if response.status_code == 401:
+                    logger.error("API认证失败 (401 Unauthorized)。请检查您的API密钥。")
+                    return None # 认证错误不应重试
+                if response.status_code == 429:
+                    logger.warning("API速率限制。请稍后重试。")
+                    retry_after = self._retry_after_seconds(response.headers)
+                    if retry_after is None:
+                        retry_after = self._retry_delay(retry_count + 1)
+                    self._rate_limit_until = time.monotonic() + retry_after
                 
-                logging.info(f"API调用成功，响应长度: {len(cleaned_text)}字符")
+                response.raise_for_status()
+                cleaned_text = self._extract_response_text(self._parse_response_body(response))
+                
+                logger.info("API调用成功，响应长度: %d字符", len(cleaned_text))
+                if cache_key is not None:
+                    self._store_cached_response(cache_key, cleaned_text)
                 return cleaned_text
                 
-            except requests.exceptions.Timeout as e:
+            except httpx.TimeoutException as e:
                 last_error = f"请求超时: {str(e)}"
-            except requests.exceptions.ConnectionError as e:
+            except httpx.TransportError as e:
                 last_error = f"连接错误: {str(e)}"
-            except requests.exceptions.RequestException as e: # 包括HTTP错误
+            except httpx.HTTPStatusError as e:
                 last_error = f"请求异常: {str(e)}"
-                if response and response.status_code == 401:
-                     logging.error(f"API认证失败 (401 Unauthorized)。请检查您的API密钥。")
-                     return None # 认证错误不应重试
-                if response and response.status_code == 429:
-                     logging.warning(f"API速率限制。请稍后重试。")
-                     # 可以考虑实现更复杂的退避策略
             except (ValueError, json.JSONDecodeError) as e: # 包括API返回内容为空的ValueError
                 last_error = f"响应解析错误或内容无效: {str(e)}"
             except Exception as e:
@@ -156,24 +438,76 @@ class SimplifiedApiClient:
 
             retry_count += 1
             if retry_count <= max_retries:
-                sleep_time = min(
-                    DEFAULT_RETRY_DELAY * (2 ** (retry_count - 1)) * (1 + random.random() * 0.2),
-                    DEFAULT_MAX_RETRY_DELAY
-                )
-                logging.warning(f"API调用失败 ({retry_count-1}/{max_retries}): {last_error}")
-                logging.info(f"等待 {sleep_time:.1f} 秒后重试...")
-                time.sleep(sleep_time)
+                sleep_time = self._retry_delay(retry_count)
+                logger.warning("API调用失败 (%d/%d): %s", retry_count - 1, max_retries, last_error)
+                logger.info("等待 %.1f 秒后重试...", sleep_time)
+                await asyncio.sleep(sleep_time)
             else:
-                logging.error(f"已达到最大重试次数 ({max_retries})，放弃API调用。最后错误: {last_error}")
+                logger.error("已达到最大重试次数 (%d)，放弃API调用。最后错误: %s", max_retries, last_error)
                 break
         
         return None
 
+    def translate_batch(self, prompts: List[str], temperature: float = DEFAULT_TEMPERATURE, concurrency: int = 8, system_prompt: Optional[str] = None) -> List[Optional[str]]:
+        """
+        并发翻译多个提示，同时在途的请求数不超过 concurrency。
+
+        参数:
+            prompts: 提示列表。
+            temperature: 控制生成文本的随机性。
+            concurrency: 最大并发请求数。
+            system_prompt: (可选) 所有提示共享的稳定前缀，同 translate_text。
+
+        返回:
+            与 prompts 顺序一致的翻译结果列表，失败的项为None。
+        """
+        if httpx is None:
+            raise ImportError("并发批量翻译需要安装 httpx: pip install httpx")
+        return asyncio.run(self._translate_batch_async(prompts, temperature, concurrency, system_prompt))
+
+    async def _translate_batch_async(self, prompts: List[str], temperature: float, concurrency: int, system_prompt: Optional[str]) -> List[Optional[str]]:
+        semaphore = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(headers=self._headers, timeout=DEFAULT_API_TIMEOUT, limits=limits) as client:
+            async def _bounded(prompt: str) -> Optional[str]:
+                async with semaphore:
+                    return await self.translate_text_async(client, prompt, temperature=temperature, system_prompt=system_prompt)
+            
+            return await asyncio.gather(*(_bounded(prompt) for prompt in prompts))
+
 class SimplifiedPromptBuilder:
     """简化的提示构建器"""
-    def __init__(self, template_str: str = DEFAULT_TRANSLATE_PROMPT_TEMPLATE):
+    def __init__(self, template_str: str = DEFAULT_TRANSLATE_PROMPT_TEMPLATE,
+                 system_template_str: str = DEFAULT_TRANSLATE_SYSTEM_TEMPLATE,
+                 user_template_str: str = DEFAULT_TRANSLATE_USER_TEMPLATE):
         self.template = template_str
-        logging.info("初始化简易提示构建器")
+        self.system_template = system_template_str
+        self.user_template = user_template_str
+        # 加载时记录各模板实际包含的占位符，构建时不含占位符的模板原样返回
+        self._template_fields: Dict[str, frozenset] = {}
+        for template in (template_str, system_template_str, user_template_str):
+            self._placeholders_in(template)
+        logger.info("初始化简易提示构建器")
+
+    def _placeholders_in(self, template: str) -> frozenset:
+        """返回模板中出现的占位符名称集合（按模板内容缓存）"""
+        fields = self._template_fields.get(template)
+        if fields is None:
+            fields = frozenset(_PLACEHOLDER_RE.findall(template))
+            self._template_fields[template] = fields
+        return fields
+
+    def _render(self, template: str, korean_text: str, terminology: Optional[str], custom_instructions: Optional[str]) -> str:
+        """单次扫描替换模板中的占位符"""
+        fields = self._placeholders_in(template)
+        if not fields:
+            return template
+        values = {"korean_text": korean_text}
+        if "terminology" in fields:
+            values["terminology"] = terminology or "无特定术语。"
+        if "custom_instructions" in fields:
+            values["custom_instructions"] = custom_instructions or "请注意翻译的准确性和流畅性。"
+        return _PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], template)
 
     def build_translation_prompt(self, korean_text: str, terminology: Optional[str] = None, custom_instructions: Optional[str] = None) -> str:
         """
@@ -187,14 +521,29 @@ class SimplifiedPromptBuilder:
         返回:
             完整的翻译提示字符串。
         """
-        final_prompt = self.template
-        final_prompt = final_prompt.replace("{korean_text}", korean_text)
-        final_prompt = final_prompt.replace("{terminology}", terminology or "无特定术语。")
-        final_prompt = final_prompt.replace("{custom_instructions}", custom_instructions or "请注意翻译的准确性和流畅性。")
+        final_prompt = self._render(self.template, korean_text, terminology, custom_instructions)
         
-        logging.debug(f"构建完成翻译提示，总长度: {len(final_prompt)} 字符")
+        logger.debug("构建完成翻译提示，总长度: %d 字符", len(final_prompt))
         return final_prompt
 
+    def build_translation_messages(self, korean_text: str, terminology: Optional[str] = None, custom_instructions: Optional[str] = None) -> Tuple[str, str]:
+        """
+        构建拆分为稳定前缀和待翻译文本两部分的翻译提示，供 translate_text 的 system_prompt 参数使用。
+
+        参数:
+            korean_text: 需要翻译的韩文文本。
+            terminology: (可选) 格式化的术语库字符串。
+            custom_instructions: (可选) 用户自定义的翻译指令。
+
+        返回:
+            (system_text, user_text)；同一批次中 system_text 保持不变。
+        """
+        system_text = self._render(self.system_template, korean_text, terminology, custom_instructions)
+        user_text = self._render(self.user_template, korean_text, terminology, custom_instructions)
+        
+        logger.debug("构建完成翻译提示，前缀长度: %d 字符，正文长度: %d 字符", len(system_text), len(user_text))
+        return system_text, user_text
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="简易文本翻译工具")
     parser.add_argument("text_to_translate", type=str, help="需要翻译的韩文文本内容。")
@@ -204,6 +553,7 @@ if __name__ == "__main__":
     parser.add_argument("--terminology", type=str, default=None, help="(可选) 包含术语的字符串。例如：'### 人物\n- 한국어 → 韩语\n### 专有名词\n- 서울 → 首尔'")
     parser.add_argument("--instructions", type=str, default=None, help="(可选) 自定义翻译指令，例如：'保持原文的幽默风格。'")
     parser.add_argument("--temp", type=float, default=DEFAULT_TEMPERATURE, help=f"温度参数。默认为：{DEFAULT_TEMPERATURE}")
+    parser.add_argument("--vendor", type=str, default=None, choices=["openai", "anthropic"], help="(可选) API服务商。指定后将指令和术语库作为独立的 system 消息发送以利用前缀缓存；anthropic 会附加 cache_control 标记。")
     
     args = parser.parse_args()
 
@@ -216,21 +566,31 @@ if __name__ == "__main__":
         # 仍然尝试运行，但很可能会失败
 
     try:
-        translator_client = SimplifiedApiClient(api_key=args.api_key, api_url=args.api_url, model_name=args.model)
+        translator_client = SimplifiedApiClient(api_key=args.api_key, api_url=args.api_url, model_name=args.model, vendor=args.vendor)
         prompt_builder = SimplifiedPromptBuilder()
 
-        full_prompt = prompt_builder.build_translation_prompt(
-            korean_text=args.text_to_translate,
-            terminology=args.terminology,
-            custom_instructions=args.instructions
-        )
+        if args.vendor:
+            system_prompt, full_prompt = prompt_builder.build_translation_messages(
+                korean_text=args.text_to_translate,
+                terminology=args.terminology,
+                custom_instructions=args.instructions
+            )
+        else:
+            system_prompt = None
+            full_prompt = prompt_builder.build_translation_prompt(
+                korean_text=args.text_to_translate,
+                terminology=args.terminology,
+                custom_instructions=args.instructions
+            )
 
         print("--- 构建的提示 ---")
+        if system_prompt:
+            print(system_prompt)
         print(full_prompt)
         print("---------------------")
         print("正在翻译，请稍候...")
 
-        translated_text = translator_client.translate_text(prompt=full_prompt, temperature=args.temp)
+        translated_text = translator_client.translate_text(prompt=full_prompt, temperature=args.temp, system_prompt=system_prompt)
 
         if translated_text:
             print("\n--- 翻译结果 ---")
@@ -1,6 +1,13 @@
+import atexit
 import json
 import logging
+import mmap
 import os
+import re
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Any, Optional, Tuple
 from config import (
     get_novel_character_file, 
@@ -14,6 +21,106 @@ from config import (
 
 import config
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库 json
+    orjson = None
+
+
+def _json_loads(raw: bytes) -> Any:
+    """解析JSON字节串，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# 术语库改动的最短写盘间隔（秒），间隔内的多次更新合并为一次写入
+_FLUSH_INTERVAL = 5.0
+
+# 小于该大小的文件直接读入，映射本身的开销比省下的复制更大
+_MMAP_MIN_SIZE = 4096
+
+# 进程退出时等待其他线程完成写盘的最长时间（秒）
+_EXIT_FLUSH_TIMEOUT = 5.0
+
+# 存活的术语管理器，进程正常退出时写入它们尚未保存的改动
+_live_managers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_managers():
+    """
+    退出兜底：atexit 阶段线程池已不再接受新任务，而 __del__ 在解释器清理模块时可能连内置函数都已不可用，
+    因此在这里逐个文件串行写入仍有改动的术语管理器
+    """
+    for manager in list(_live_managers):
+        # 守护线程可能停在写盘中途并一直持有锁，等待有限时间后放弃，避免进程无法退出
+        if not manager._flush_lock.acquire(timeout=_EXIT_FLUSH_TIMEOUT):
+            continue
+        try:
+            if manager._dirty:
+                manager._write_pending(parallel=False)
+        except Exception:
+            pass
+        finally:
+            manager._flush_lock.release()
+
+
+def _read_json_file(filepath: str) -> Any:
+    """
+    读取并解析JSON文件。安装了 orjson 时，较大的文件通过 mmap 映射后直接交给 orjson 解析，
+    由系统页缓存提供数据，省去把整个文件复制到用户态缓冲区的一步
+    """
+    with open(filepath, 'rb') as file:
+        if orjson is None or os.fstat(file.fileno()).st_size < _MMAP_MIN_SIZE:
+            return _json_loads(file.read())
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # orjson 不直接接受 mmap 对象，通过 memoryview 传入；解析完成后先释放视图才能关闭映射
+            with memoryview(mapped) as view:
+                return orjson.loads(view)
+
+
+def _json_dumps(data: Any) -> bytes:
+    """将数据序列化为缩进2格的UTF-8 JSON字节串，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+# API响应中各类术语更新章节的标题
+_SECTION_HEADER_RE = re.compile(r'### (更新人物|人物更新|更新专有名词|专有名词更新|更新文化表达|文化表达更新)')
+# 章节标题到术语类别的映射
+_SECTION_CATEGORIES = {
+    "更新人物": "characters",
+    "人物更新": "characters",
+    "更新专有名词": "proper_nouns",
+    "专有名词更新": "proper_nouns",
+    "更新文化表达": "cultural_expressions",
+    "文化表达更新": "cultural_expressions",
+}
+
+# 标准化后各类术语条目的字段
+# 条目保持为普通字典而不是 __slots__ 数据类：文件读写、PromptBuilder 和 api_test 都按键访问条目，
+# 且 orjson/json 解析同一文件时已复用同一个键字符串对象，改为数据类省下的内存不抵改动面
+_CHARACTER_KEYS = frozenset(("name", "alias", "description"))
+_PROPER_NOUN_KEYS = frozenset(("original", "translated", "description"))
+_CULTURAL_EXPRESSION_KEYS = frozenset(("original", "translated", "explanation"))
+
+# 术语更新条目的解析规则，模块加载时编译一次；各字段均不跨行
+# 条目必须位于行首（允许缩进），每个字段都是排除了其后分隔符与换行的字符类，
+# 匹配时不会回溯，长文本或异常输入下耗时也与文本长度成线性关系
+# 人物: "- 名称 (别名: 别名1, 别名2): 描述"，别名与描述均可省略
+_CHARACTER_ENTRY_RE = re.compile(
+    r'^[ \t]*- (?P<name>[^:()\r\n]+)(?:\(别名:\s*(?P<alias>[^)\r\n]+)\))?(?::\s*(?P<desc>[^\r\n]+))?',
+    re.MULTILINE
+)
+# 专有名词/文化表达: "- 原词 → 译词: 描述"，译词与描述均可省略
+_TERM_ENTRY_RE = re.compile(
+    r'^[ \t]*- (?P<original>[^→:\r\n]+)(?:→\s*(?P<translated>[^:\r\n]+))?(?::\s*(?P<desc>[^\r\n]+))?',
+    re.MULTILINE
+)
+
+
 class TerminologyManager:
     """负责加载、格式化和更新术语库"""
 
@@ -25,84 +132,193 @@ class TerminologyManager:
             novel_name: 小说名称，用于定位和管理特定小说的术语库
         """
         self.novel_name = novel_name
-        self.characters = []
-        self.proper_nouns = []
-        self.cultural_expressions = []
+        # 三类术语在首次访问时才从文件加载，见对应的属性
+        self._characters = None
+        self._proper_nouns = None
+        self._cultural_expressions = None
+        # 管理器会被并行翻译的多个工作线程共享，首次加载需加锁，避免重复读盘或覆盖其他线程已写入的条目
+        self._load_lock = threading.Lock()
+        # get_formatted_terminology 的缓存结果，术语库变化时清空
+        self._formatted_cache: Optional[str] = None
+        # 是否有尚未写入文件的改动，以及上次写入的时间
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        # 写盘互斥：多个工作线程同时 flush 时不会交错写入同一个临时文件，也不会丢失保存期间新增的改动
+        self._flush_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
+        _live_managers.add(self)
         
         # 确保小说术语库目录存在
         self._ensure_novel_terminology_dir()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush(force=True)
+        return False
+    
+    def __del__(self):
+        # 兜底：运行期间对象被回收时写入尚未保存的改动（进程退出时由 _flush_live_managers 负责）。
+        # 正常流程应调用 flush(force=True) 或使用 with 语句；回收时不再使用线程池，逐个文件串行写入
+        try:
+            if self._dirty:
+                self._write_pending(parallel=False)
+        except Exception:
+            pass
         
-        # 加载术语库
-        self.load_terminology()
+    @property
+    def characters(self):
+        """人物术语列表，首次访问时加载"""
+        if self._characters is None:
+            with self._load_lock:
+                if self._characters is None:
+                    self._load_characters()
+        return self._characters
+    
+    @characters.setter
+    def characters(self, value):
+        # 外部传入的条目同样标准化，保证列表中的字典总是包含全部字段
+        self._characters = None if value is None else self._standardize_entries(value, _CHARACTER_KEYS, self._standardize_character)
+        self._invalidate_cache()
+    
+    @property
+    def proper_nouns(self):
+        """专有名词术语列表，首次访问时加载"""
+        if self._proper_nouns is None:
+            with self._load_lock:
+                if self._proper_nouns is None:
+                    self._load_proper_nouns()
+        return self._proper_nouns
+    
+    @proper_nouns.setter
+    def proper_nouns(self, value):
+        # 外部传入的条目同样标准化，保证列表中的字典总是包含全部字段
+        self._proper_nouns = None if value is None else self._standardize_entries(value, _PROPER_NOUN_KEYS, self._standardize_noun)
+        self._invalidate_cache()
+    
+    @property
+    def cultural_expressions(self):
+        """文化表达术语列表，首次访问时加载"""
+        if self._cultural_expressions is None:
+            with self._load_lock:
+                if self._cultural_expressions is None:
+                    self._load_cultural_expressions()
+        return self._cultural_expressions
+    
+    @cultural_expressions.setter
+    def cultural_expressions(self, value):
+        # 外部传入的条目同样标准化，保证列表中的字典总是包含全部字段
+        self._cultural_expressions = None if value is None else self._standardize_entries(value, _CULTURAL_EXPRESSION_KEYS, self._standardize_expression)
+        self._invalidate_cache()
         
     def _ensure_novel_terminology_dir(self):
-        """确保小说的术语库目录存在，如果不存在则创建"""
-        novel_term_dir = get_novel_terminology_dir(self.novel_name)
-        if not os.path.exists(novel_term_dir):
-            os.makedirs(novel_term_dir, exist_ok=True)
-            self.logger.info(f"为小说「{self.novel_name}」创建术语库目录: {novel_term_dir}")
+        """确保小说的术语库目录存在，如果不存在则创建（已确认存在的目录由 config 记录，不会重复检查）"""
+        get_novel_terminology_dir(self.novel_name)
     
     def load_terminology(self):
         """
-        加载术语库
+        立即加载全部术语库（重新加载时会覆盖内存中的内容）
         先尝试加载特定小说的术语库，如果文件不存在，则从全局术语库复制
         """
-        # 获取当前小说的术语库文件路径
-        character_file = get_novel_character_file(self.novel_name)
-        proper_nouns_file = get_novel_proper_nouns_file(self.novel_name)
-        cultural_expressions_file = get_novel_cultural_expressions_file(self.novel_name)
+        # 整个加载过程持有 _load_lock，同时访问的惰性属性会等待本次加载完成，而不是再读一遍文件
+        with self._load_lock:
+            # 列一次目录代替逐个文件检查是否存在
+            with os.scandir(get_novel_terminology_dir(self.novel_name)) as it:
+                existing = {entry.name for entry in it if entry.is_file()}
         
-        # 加载人物术语
-        if os.path.exists(character_file):
-            self.characters = self._load_file(character_file)
-            self.logger.info(f"已加载小说「{self.novel_name}」的人物术语: {len(self.characters)} 条记录")
-        elif os.path.exists(GLOBAL_CHARACTER_FILE):
-            # 如果小说特定的文件不存在但全局文件存在，从全局复制
-            self.characters = self._load_file(GLOBAL_CHARACTER_FILE)
-            self._save_file(character_file, self.characters)
-            self.logger.info(f"已从全局术语库复制人物术语到小说「{self.novel_name}」: {len(self.characters)} 条记录")
-        else:
-            self.logger.warning(f"人物术语库文件不存在，创建空术语库: {character_file}")
-            self._save_file(character_file, [])
-        
-        # 加载专有名词术语
-        if os.path.exists(proper_nouns_file):
-            self.proper_nouns = self._load_file(proper_nouns_file)
-            self.logger.info(f"已加载小说「{self.novel_name}」的专有名词术语: {len(self.proper_nouns)} 条记录")
-        elif os.path.exists(GLOBAL_PROPER_NOUNS_FILE):
-            # 如果小说特定的文件不存在但全局文件存在，从全局复制
-            self.proper_nouns = self._load_file(GLOBAL_PROPER_NOUNS_FILE)
-            self._save_file(proper_nouns_file, self.proper_nouns)
-            self.logger.info(f"已从全局术语库复制专有名词术语到小说「{self.novel_name}」: {len(self.proper_nouns)} 条记录")
-        else:
-            self.logger.warning(f"专有名词术语库文件不存在，创建空术语库: {proper_nouns_file}")
-            self._save_file(proper_nouns_file, [])
-            
-        # 加载文化表达术语
-        if os.path.exists(cultural_expressions_file):
-            self.cultural_expressions = self._load_file(cultural_expressions_file)
-            self.logger.info(f"已加载小说「{self.novel_name}」的文化表达术语: {len(self.cultural_expressions)} 条记录")
-        elif os.path.exists(GLOBAL_CULTURAL_EXPRESSIONS_FILE):
+            # 三类术语文件互不相关，放到线程池里并行读取，重叠各文件的磁盘等待
+            # （读文件时会释放 GIL，JSON 解析本身不会，仍是串行的）；各任务的日志先收集起来，全部完成后按固定顺序输出
+            tasks = []
+            for attr, novel_file, global_file, label in (
+                ("characters", get_novel_character_file(self.novel_name), GLOBAL_CHARACTER_FILE, "人物"),
+                ("proper_nouns", get_novel_proper_nouns_file(self.novel_name), GLOBAL_PROPER_NOUNS_FILE, "专有名词"),
+                ("cultural_expressions", get_novel_cultural_expressions_file(self.novel_name), GLOBAL_CULTURAL_EXPRESSIONS_FILE, "文化表达"),
+            ):
+                tasks.append((attr, novel_file, global_file, label, os.path.basename(novel_file) in existing))
+            results = {}
+            messages = {}
+            with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+                futures = [executor.submit(self._load_category_task, *task) for task in tasks]
+                for future in as_completed(futures):
+                    attr, entries, log = future.result()
+                    results[attr] = entries
+                    messages[attr] = log
+        
+            for attr, *_ in tasks:
+                for level, message in messages[attr]:
+                    self.logger.log(level, message)
+        
+            self._characters = self._standardize_entries(results["characters"], _CHARACTER_KEYS, self._standardize_character)
+            self._proper_nouns = self._standardize_entries(results["proper_nouns"], _PROPER_NOUN_KEYS, self._standardize_noun)
+            self._cultural_expressions = self._standardize_entries(results["cultural_expressions"], _CULTURAL_EXPRESSION_KEYS, self._standardize_expression)
+            self._invalidate_cache()
+    
+    def _load_category_task(self, attr, novel_file, global_file, label, novel_exists):
+        """线程池任务：加载一类术语，返回 (属性名, 未标准化的条目, 待输出的日志)"""
+        log = []
+        return attr, self._load_category(novel_file, global_file, label, log, novel_exists), log
+    
+    def _load_characters(self):
+        """加载并标准化人物术语"""
+        characters = self._load_category(get_novel_character_file(self.novel_name), GLOBAL_CHARACTER_FILE, "人物")
+        self._characters = self._standardize_entries(characters, _CHARACTER_KEYS, self._standardize_character)
+        self._invalidate_cache()
+    
+    def _load_proper_nouns(self):
+        """加载并标准化专有名词术语"""
+        proper_nouns = self._load_category(get_novel_proper_nouns_file(self.novel_name), GLOBAL_PROPER_NOUNS_FILE, "专有名词")
+        self._proper_nouns = self._standardize_entries(proper_nouns, _PROPER_NOUN_KEYS, self._standardize_noun)
+        self._invalidate_cache()
+    
+    def _load_cultural_expressions(self):
+        """加载并标准化文化表达术语"""
+        cultural_expressions = self._load_category(get_novel_cultural_expressions_file(self.novel_name), GLOBAL_CULTURAL_EXPRESSIONS_FILE, "文化表达")
+        self._cultural_expressions = self._standardize_entries(cultural_expressions, _CULTURAL_EXPRESSION_KEYS, self._standardize_expression)
+        self._invalidate_cache()
+    
+    def _load_category(self, novel_file, global_file, label, log=None, novel_exists=None):
+        """
+        加载一类术语：优先读取小说自己的文件，不存在时从全局术语库复制，都不存在则创建空文件
+        
+        Args:
+            novel_file: 小说的术语库文件路径
+            global_file: 全局术语库文件路径
+            label: 术语类别名称，用于日志
+            log: 可选的日志收集列表，传入时追加 (级别, 消息) 而不是直接输出
+            novel_exists: 调用方已知的小说文件是否存在，为 None 时自行检查
+        
+        Returns:
+            list: 未经标准化的术语条目
+        """
+        messages = [] if log is None else log
+        if novel_exists is None:
+            novel_exists = os.path.exists(novel_file)
+        if novel_exists:
+            entries = self._load_file(novel_file)
+            messages.append((logging.INFO, f"已加载小说「{self.novel_name}」的{label}术语: {len(entries)} 条记录"))
+        elif os.path.exists(global_file):
             # 如果小说特定的文件不存在但全局文件存在，从全局复制
-            self.cultural_expressions = self._load_file(GLOBAL_CULTURAL_EXPRESSIONS_FILE)
-            self._save_file(cultural_expressions_file, self.cultural_expressions)
-            self.logger.info(f"已从全局术语库复制文化表达术语到小说「{self.novel_name}」: {len(self.cultural_expressions)} 条记录")
+            entries = self._load_file(global_file)
+            self._save_file(novel_file, entries)
+            messages.append((logging.INFO, f"已从全局术语库复制{label}术语到小说「{self.novel_name}」: {len(entries)} 条记录"))
         else:
-            self.logger.warning(f"文化表达术语库文件不存在，创建空术语库: {cultural_expressions_file}")
-            self._save_file(cultural_expressions_file, [])
+            entries = []
+            messages.append((logging.WARNING, f"{label}术语库文件不存在，创建空术语库: {novel_file}"))
+            self._save_file(novel_file, [])
         
-        # 标准化所有术语格式
-        self._standardize_all()
+        if log is None:
+            for level, message in messages:
+                self.logger.log(level, message)
+        return entries
     
     def _load_file(self, filepath):
         """从文件加载数据，处理可能的错误"""
         try:
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as file:
-                    return json.load(file)
+            return _read_json_file(filepath)
+        except FileNotFoundError:
             return []
-        except json.JSONDecodeError:
+        except ValueError:  # json.JSONDecodeError 与 orjson.JSONDecodeError 均为 ValueError 的子类
             self.logger.error(f"解析 JSON 文件失败: {filepath}, 将返回空列表")
             return []
         except Exception as e:
@@ -112,18 +328,80 @@ class TerminologyManager:
     def _save_file(self, filepath, data):
         """保存数据到文件，处理可能的错误"""
         try:
-            with open(filepath, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=2)
+            payload = _json_dumps(data)
+        except Exception as e:
+            self.logger.error(f"序列化术语数据失败: {filepath}, 错误: {str(e)}")
+            return False
+        return self._atomic_save(filepath, payload)
+    
+    def _atomic_save(self, filepath, payload):
+        """
+        原子地写入文件：先写入同目录下的临时文件并落盘，再替换目标文件，
+        中途失败不会留下写了一半的术语库文件
+        
+        Args:
+            filepath: 目标文件路径
+            payload: 要写入的字节串
+        
+        Returns:
+            bool: 是否保存成功
+        """
+        tmp_path = filepath + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(payload)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, filepath)
             return True
         except Exception as e:
             self.logger.error(f"保存文件失败: {filepath}, 错误: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return False
     
-    def _standardize_all(self):
-        """标准化所有术语格式"""
-        self.characters = [self._standardize_character(c) for c in self.characters]
-        self.proper_nouns = [self._standardize_noun(n) for n in self.proper_nouns]
-        self.cultural_expressions = [self._standardize_expression(e) for e in self.cultural_expressions]
+    def _save_files(self, items, parallel=True):
+        """
+        并发保存多个文件。三个术语库文件互不相关，序列化和写盘都在各自的线程中进行，
+        orjson 序列化与等待磁盘的时间可以互相重叠
+        
+        Args:
+            items: (文件路径, 数据) 列表
+            parallel: 为 False 时在当前线程中逐个保存（解释器退出阶段无法使用线程池）
+        
+        Returns:
+            bool: 是否全部保存成功
+        """
+        if not parallel:
+            return all([self._save_file(filepath, data) for filepath, data in items])
+        with ThreadPoolExecutor(max_workers=len(items)) as executor:
+            futures = [executor.submit(self._save_file, filepath, data) for filepath, data in items]
+            return all([future.result() for future in futures])
+    
+    def _invalidate_cache(self):
+        """术语库内容可能发生变化时调用：清空格式化缓存"""
+        self._formatted_cache = None
+    
+    @staticmethod
+    def _standardize_entries(entries, keys, standardize):
+        """
+        标准化术语条目列表。由本程序保存的文件中条目已是标准格式，
+        这类条目原样保留，只就地替换字段不符的条目，避免每次加载都重建全部字典
+        
+        Args:
+            entries: 从文件加载的术语条目
+            keys: 标准格式应包含的字段集合
+            standardize: 单个条目的标准化方法
+        
+        Returns:
+            list: 标准化后的条目列表
+        """
+        if not isinstance(entries, list):
+            entries = list(entries)
+        for i, entry in enumerate(entries):
+            if type(entry) is not dict or entry.keys() != keys:
+                entries[i] = standardize(entry)
+        return entries
     
     def _standardize_character(self, character):
         """
@@ -182,61 +460,60 @@ class TerminologyManager:
     def get_formatted_terminology(self):
         """
         获取格式化的术语库，用于翻译提示
+        术语库未变化时直接返回上次的结果
         """
-        formatted = "## 术语库\n\n"
+        if self._formatted_cache is not None:
+            return self._formatted_cache
+        
+        parts = ["## 术语库\n\n"]
+        append = parts.append
         
         # 添加人物列表
         if self.characters:
-            formatted += "### 人物\n"
+            append("### 人物\n")
             for char in self.characters:
-                name = char.get("name", "")
-                alias = char.get("alias", [])
-                desc = char.get("description", "")
+                name = char["name"]
+                alias = char["alias"]
+                desc = char["description"]
                 
-                formatted += f"- {name}"
+                append(f"- {name}")
                 if alias:
-                    formatted += f" (别名: {', '.join(alias)})"
+                    append(f" (别名: {', '.join(alias)})")
                 if desc:
-                    formatted += f": {desc}"
-                formatted += "\n"
-            formatted += "\n"
+                    append(f": {desc}")
+                append("\n")
+            append("\n")
         
         # 添加专有名词
         if self.proper_nouns:
-            formatted += "### 专有名词\n"
+            append("### 专有名词\n")
             for noun in self.proper_nouns:
-                original = noun.get("original", "")
-                translated = noun.get("translated", "")
-                desc = noun.get("description", "")
-                
-                if translated:
-                    formatted += f"- {original} → {translated}"
-                else:
-                    formatted += f"- {original}"
+                original = noun["original"]
+                translated = noun["translated"]
+                desc = noun["description"]
                 
+                append(f"- {original} → {translated}" if translated else f"- {original}")
                 if desc:
-                    formatted += f": {desc}"
-                formatted += "\n"
-            formatted += "\n"
+                    append(f": {desc}")
+                append("\n")
+            append("\n")
         
         # 添加文化表达
         if self.cultural_expressions:
-            formatted += "### 文化表达\n"
+            append("### 文化表达\n")
             for expr in self.cultural_expressions:
-                original = expr.get("original", "")
-                translated = expr.get("translated", "")
-                explanation = expr.get("explanation", "")
-                
-                if translated:
-                    formatted += f"- {original} → {translated}"
-                else:
-                    formatted += f"- {original}"
+                original = expr["original"]
+                translated = expr["translated"]
+                explanation = expr["explanation"]
                 
+                append(f"- {original} → {translated}" if translated else f"- {original}")
                 if explanation:
-                    formatted += f": {explanation}"
-                formatted += "\n"
-            formatted += "\n"
+                    append(f": {explanation}")
+                append("\n")
+            append("\n")
         
+        formatted = "".join(parts)
+        self._formatted_cache = formatted
         return formatted
     
     def update_terminology_from_api_response(self, response_text):
@@ -246,113 +523,116 @@ class TerminologyManager:
         Args:
             response_text: API响应的文本，包含更新建议
         
+        Returns:
+            tuple: 更新的(人物数量, 专有名词数量, 文化表达数量)
+        """
+        # 大多数响应不含任何术语更新章节，一次扫描确认后直接返回，省去按行切分和逐行处理
+        if not _SECTION_HEADER_RE.search(response_text):
+            self.logger.info("API响应中未找到有效的术语更新建议")
+            return (0, 0, 0)
+        return self.update_terminology_from_api_stream(response_text.splitlines(True))
+    
+    def update_terminology_from_api_stream(self, lines):
+        """
+        从逐行到达的API响应更新术语库，内存中只保留当前章节的正文；
+        每个章节在下一个章节标题到达时即被处理
+        
+        Args:
+            lines: 可迭代的文本行（保留行尾换行符），如流式响应的行迭代器
+        
         Returns:
             tuple: 更新的(人物数量, 专有名词数量, 文化表达数量)
         """
         # 解析响应文本，查找术语更新建议
         # 假设响应文本包含特定格式的术语更新建议
-        chars_added = 0
-        nouns_added = 0
-        exprs_added = 0
+        added = {"characters": 0, "proper_nouns": 0, "cultural_expressions": 0}
         
         try:
-            updated = False
-            
-            # 简单的解析逻辑，可以根据实际响应格式进行调整
-            if "### 更新人物" in response_text or "### 人物更新" in response_text:
-                chars_added = self._parse_character_updates(response_text) 
-                updated = chars_added > 0 or updated
-            
-            if "### 更新专有名词" in response_text or "### 专有名词更新" in response_text:
-                nouns_added = self._parse_proper_noun_updates(response_text)
-                updated = nouns_added > 0 or updated
-            
-            if "### 更新文化表达" in response_text or "### 文化表达更新" in response_text:
-                exprs_added = self._parse_cultural_expression_updates(response_text)
-                updated = exprs_added > 0 or updated
+            processors = {
+                "characters": self._process_character_body,
+                "proper_nouns": self._process_proper_noun_body,
+                "cultural_expressions": self._process_cultural_expression_body,
+            }
             
-            # 如果有更新，保存术语库
+            # 当前所在章节的类别与已缓存的正文；第一个章节标题之前的文本直接丢弃
+            category = None
+            buffer = []
+            parsed = False
+            
+            for line in lines:
+                pos = 0
+                # 绝大多数行是条目正文，先用子串查找排除，不含标题前缀的行不进正则引擎
+                matches = _SECTION_HEADER_RE.finditer(line) if "### " in line else ()
+                for match in matches:
+                    # 遇到新的章节标题：标题前的部分属于上一章节，上一章节到此结束
+                    if category is not None:
+                        buffer.append(line[pos:match.start()])
+                        added[category] += processors[category]("".join(buffer))
+                    category = _SECTION_CATEGORIES[match.group(1)]
+                    buffer = []
+                    pos = match.end()
+                    parsed = True
+                if category is not None:
+                    buffer.append(line[pos:])
+            
+            if category is not None:
+                added[category] += processors[category]("".join(buffer))
+            
+            updated = any(added.values())
+            
+            # 解析过程可能修改已有条目（别名、描述），即使没有新增也视为版本变化
+            if parsed:
+                self._invalidate_cache()
+            
+            # 如果有更新，标记为待保存；距上次写入足够久时才真正写盘
             if updated:
-                self._save_all_terminology()
+                self._dirty = True
+                self.flush()
                 self.logger.info(f"成功更新小说「{self.novel_name}」的术语库")
             else:
                 self.logger.info("API响应中未找到有效的术语更新建议")
             
-            return (chars_added, nouns_added, exprs_added)
+            return (added["characters"], added["proper_nouns"], added["cultural_expressions"])
             
         except Exception as e:
             self.logger.error(f"解析API响应以更新术语库时出错: {str(e)}")
             return (0, 0, 0)
     
-    def _parse_character_updates(self, response_text):
+    def _process_character_body(self, section_text):
         """
-        解析人物更新建议
-        返回: 更新的人物数量
+        解析一个人物更新章节的正文
+        返回: 新增的人物数量
         """
         try:
-            # 查找人物更新章节
-            section_start = None
-            for pattern in ["### 更新人物", "### 人物更新"]:
-                if pattern in response_text:
-                    section_start = response_text.find(pattern)
-                    break
-                    
-            if section_start is None:
-                return 0
-                
-            # 获取人物更新部分的文本
-            section_text = response_text[section_start:]
-            
-            # 查找下一个章节开始，如果有的话
-            next_section = None
-            for pattern in ["### 更新专有名词", "### 专有名词更新", "### 更新文化表达", "### 文化表达更新"]:
-                next_pos = section_text.find(pattern)
-                if next_pos > 0:
-                    next_section = next_pos
-                    break
-            
-            # 提取人物更新部分
-            if next_section:
-                section_text = section_text[:next_section]
-            
-            # 用正则表达式提取人物信息
-            import re
-            
-            # 首先匹配带别名的格式
-            alias_pattern = r'- ([^:()]+)\s+\(别名:\s*([^)]+)\)(?::\s*(.+))?'
-            alias_matches = re.findall(alias_pattern, section_text)
-            
-            chars_added = 0
-            processed_names = []
-            
-            # 处理带别名的人物
-            for match in alias_matches:
-                name = match[0].strip()
-                processed_names.append(name)  # 记录已处理的名称
-                
-                alias_str = match[1].strip()
-                alias_list = [a.strip() for a in alias_str.split(',')]
-                desc = match[2].strip() if len(match) > 2 and match[2] else ""
+            # 新条目先收集起来，解析完成后一次性追加到术语列表
+            new_chars = []
+            # 名称到人物条目的索引，避免每个匹配都线性扫描；同名时保留第一条，与原查找顺序一致
+            char_index = {char["name"]: char for char in reversed(self.characters)}
+            
+            # 带别名与不带别名的格式由同一个正则处理，每个条目只匹配一次
+            for match in _CHARACTER_ENTRY_RE.finditer(section_text):
+                name = match["name"].strip()
+                alias_str = match["alias"]
+                alias_list = [a.strip() for a in alias_str.split(',')] if alias_str else []
+                desc = (match["desc"] or "").strip()
                 
                 # 查找是否已存在此人物
-                existing_char = None
-                for char in self.characters:
-                    if char.get("name") == name:
-                        existing_char = char
-                        break
+                existing_char = char_index.get(name)
                 
                 if existing_char:
                     # 如果已存在，更新信息
-                    # 更新别名，避免重复
-                    for alias in alias_list:
-                        if alias and alias not in existing_char["alias"]:
-                            existing_char["alias"].append(alias)
+                    # 更新别名，避免重复；已有别名放入集合，成员判断不再逐个比较列表
+                    if alias_list:
+                        aliases = existing_char["alias"]
+                        known_aliases = set(aliases)
+                        for alias in alias_list:
+                            if alias and alias not in known_aliases:
+                                aliases.append(alias)
+                                known_aliases.add(alias)
                     
                     # 更新描述（如果有新描述且旧描述为空）
-                    if desc and not existing_char.get("description"):
+                    if desc and not existing_char["description"]:
                         existing_char["description"] = desc
-                    
-                    # 更新信息已完成
                 else:
                     # 添加新人物
                     new_char = {
@@ -360,111 +640,43 @@ class TerminologyManager:
                         "alias": alias_list,
                         "description": desc
                     }
-                    self.characters.append(new_char)
-                    chars_added += 1
-            
-            # 然后匹配不带别名的格式
-            simple_pattern = r'- ([^:()\r\n]+)(?::\s*([^\r\n]+))?'
-            simple_matches = re.findall(simple_pattern, section_text)
-            
-            for match in simple_matches:
-                name = match[0].strip()
-                
-                # 跳过已处理的名称
-                if name in processed_names:
-                    continue
-                
-                desc = match[1].strip() if len(match) > 1 and match[1] else ""
-                
-                # 查找是否已存在此人物
-                existing_char = None
-                for char in self.characters:
-                    if char.get("name") == name:
-                        existing_char = char
-                        break
-                
-                if existing_char:
-                    # 如果已存在，更新信息
-                    # 更新描述（如果有新描述且旧描述为空）
-                    if desc and not existing_char.get("description"):
-                        existing_char["description"] = desc
-                    
-                    # 更新信息已完成
-                else:
-                    # 添加新人物
-                    new_char = {
-                        "name": name,
-                        "alias": [],
-                        "description": desc
-                    }
-                    self.characters.append(new_char)
-                    chars_added += 1
+                    new_chars.append(new_char)
+                    char_index[name] = new_char
             
+            if new_chars:
+                self.characters.extend(new_chars)
+            chars_added = len(new_chars)
             self.logger.info(f"解析到 {chars_added} 个新人物")
             return chars_added
         except Exception as e:
             self.logger.error(f"解析人物更新建议时出错: {str(e)}")
             return 0
     
-    def _parse_proper_noun_updates(self, response_text):
+    def _process_proper_noun_body(self, section_text):
         """
-        解析专有名词更新建议
-        返回: 更新的专有名词数量
+        解析一个专有名词更新章节的正文
+        返回: 新增的专有名词数量
         """
         try:
-            # 查找专有名词更新章节
-            section_start = None
-            for pattern in ["### 更新专有名词", "### 专有名词更新"]:
-                if pattern in response_text:
-                    section_start = response_text.find(pattern)
-                    break
-                    
-            if section_start is None:
-                return 0
-                
-            # 获取专有名词更新部分的文本
-            section_text = response_text[section_start:]
-            
-            # 查找下一个章节开始，如果有的话
-            next_section = None
-            for pattern in ["### 更新人物", "### 人物更新", "### 更新文化表达", "### 文化表达更新"]:
-                next_pos = section_text.find(pattern)
-                if next_pos > 0:
-                    next_section = next_pos
-                    break
-            
-            # 提取专有名词更新部分
-            if next_section:
-                section_text = section_text[:next_section]
-            
-            # 用正则表达式提取专有名词信息
-            # 匹配格式如 "- 原词 → 译词: 描述" 或 "- 原词: 描述"
-            import re
-            
-            # 首先尝试匹配带有→符号的格式
-            arrow_pattern = r'- ([^→:]+)\s*→\s*([^:]+)(?::\s*(.+))?'
-            matches = re.findall(arrow_pattern, section_text)
-            
-            nouns_added = 0
-            for match in matches:
-                original = match[0].strip()
-                translated = match[1].strip()
-                description = match[2].strip() if len(match) > 2 and match[2] else ""
+            # 匹配格式如 "- 原词 → 译词: 描述" 或 "- 原词: 描述"，两种格式由同一个正则处理
+            # 新条目先收集起来，解析完成后一次性追加到术语列表
+            new_nouns = []
+            # 原词到条目的索引，避免每个匹配都线性扫描；同名时保留第一条，与原查找顺序一致
+            noun_index = {noun["original"]: noun for noun in reversed(self.proper_nouns)}
+            for match in _TERM_ENTRY_RE.finditer(section_text):
+                original = match["original"].strip()
+                translated = (match["translated"] or "").strip()
+                description = (match["desc"] or "").strip()
                 
                 # 查找是否已存在此专有名词
-                existing_noun = None
-                for noun in self.proper_nouns:
-                    if noun.get("original") == original:
-                        existing_noun = noun
-                        break
+                existing_noun = noun_index.get(original)
                 
                 if existing_noun:
                     # 如果存在则更新
-                    if translated and not existing_noun.get("translated"):
+                    if translated and not existing_noun["translated"]:
                         existing_noun["translated"] = translated
-                    if description and not existing_noun.get("description"):
+                    if description and not existing_noun["description"]:
                         existing_noun["description"] = description
-                    # 更新信息已完成
                 else:
                     # 添加新专有名词
                     new_noun = {
@@ -472,109 +684,43 @@ class TerminologyManager:
                         "translated": translated,
                         "description": description
                     }
-                    self.proper_nouns.append(new_noun)
-                    nouns_added += 1
-            
-            # 然后尝试匹配没有→符号的格式，只处理之前没有匹配过的条目
-            # 记录已处理的原词，避免重复
-            processed_originals = [noun.get("original") for noun in self.proper_nouns]
-            simple_pattern = r'- ([^:→]+)(?::\s*(.+))?'
-            simple_matches = re.findall(simple_pattern, section_text)
-            
-            for match in simple_matches:
-                original = match[0].strip()
-                description = match[1].strip() if len(match) > 1 and match[1] else ""
-                
-                # 检查是否已处理过此原词
-                if original in processed_originals:
-                    continue
-                
-                # 查找是否已存在此专有名词
-                existing_noun = None
-                for noun in self.proper_nouns:
-                    if noun.get("original") == original:
-                        existing_noun = noun
-                        break
-                
-                if existing_noun:
-                    # 如果存在则更新
-                    if description and not existing_noun.get("description"):
-                        existing_noun["description"] = description
-                    # 更新信息已完成
-                else:
-                    # 添加新专有名词
-                    new_noun = {
-                        "original": original,
-                        "translated": "",
-                        "description": description
-                    }
-                    self.proper_nouns.append(new_noun)
-                    nouns_added += 1
+                    new_nouns.append(new_noun)
+                    noun_index[original] = new_noun
             
+            if new_nouns:
+                self.proper_nouns.extend(new_nouns)
+            nouns_added = len(new_nouns)
             self.logger.info(f"解析到 {nouns_added} 个新专有名词")
             return nouns_added
         except Exception as e:
             self.logger.error(f"解析专有名词更新建议时出错: {str(e)}")
             return 0
     
-    def _parse_cultural_expression_updates(self, response_text):
+    def _process_cultural_expression_body(self, section_text):
         """
-        解析文化表达更新建议
-        返回: 更新的文化表达数量
+        解析一个文化表达更新章节的正文
+        返回: 新增的文化表达数量
         """
         try:
-            # 查找文化表达更新章节
-            section_start = None
-            for pattern in ["### 更新文化表达", "### 文化表达更新"]:
-                if pattern in response_text:
-                    section_start = response_text.find(pattern)
-                    break
-                    
-            if section_start is None:
-                return 0
-                
-            # 获取文化表达更新部分的文本
-            section_text = response_text[section_start:]
-            
-            # 查找下一个章节开始，如果有的话
-            next_section = None
-            for pattern in ["### 更新人物", "### 人物更新", "### 更新专有名词", "### 专有名词更新"]:
-                next_pos = section_text.find(pattern)
-                if next_pos > 0:
-                    next_section = next_pos
-                    break
-            
-            # 提取文化表达更新部分
-            if next_section:
-                section_text = section_text[:next_section]
-            
-            # 用正则表达式提取文化表达信息
-            import re
-            
-            # 首先尝试匹配带有→符号的格式
-            arrow_pattern = r'- ([^→:]+)\s*→\s*([^:]+)(?::\s*(.+))?'
-            matches = re.findall(arrow_pattern, section_text)
-            
-            exprs_added = 0
-            for match in matches:
-                original = match[0].strip()
-                translated = match[1].strip()
-                explanation = match[2].strip() if len(match) > 2 and match[2] else ""
+            # 匹配格式如 "- 原词 → 译词: 描述" 或 "- 原词: 描述"，两种格式由同一个正则处理
+            # 新条目先收集起来，解析完成后一次性追加到术语列表
+            new_exprs = []
+            # 原词到条目的索引，避免每个匹配都线性扫描；同名时保留第一条，与原查找顺序一致
+            expr_index = {expr["original"]: expr for expr in reversed(self.cultural_expressions)}
+            for match in _TERM_ENTRY_RE.finditer(section_text):
+                original = match["original"].strip()
+                translated = (match["translated"] or "").strip()
+                explanation = (match["desc"] or "").strip()
                 
                 # 查找是否已存在此文化表达
-                existing_expr = None
-                for expr in self.cultural_expressions:
-                    if expr.get("original") == original:
-                        existing_expr = expr
-                        break
+                existing_expr = expr_index.get(original)
                 
                 if existing_expr:
                     # 如果存在则更新
-                    if translated and not existing_expr.get("translated"):
+                    if translated and not existing_expr["translated"]:
                         existing_expr["translated"] = translated
-                    if explanation and not existing_expr.get("explanation"):
+                    if explanation and not existing_expr["explanation"]:
                         existing_expr["explanation"] = explanation
-                    # 更新信息已完成
                 else:
                     # 添加新文化表达
                     new_expr = {
@@ -582,62 +728,70 @@ class TerminologyManager:
                         "translated": translated,
                         "explanation": explanation
                     }
-                    self.cultural_expressions.append(new_expr)
-                    exprs_added += 1
-            
-            # 然后尝试匹配没有→符号的格式，只处理之前没有匹配过的条目
-            # 记录已处理的原词，避免重复
-            processed_originals = [expr.get("original") for expr in self.cultural_expressions]
-            simple_pattern = r'- ([^:→]+)(?::\s*(.+))?'
-            simple_matches = re.findall(simple_pattern, section_text)
-            
-            for match in simple_matches:
-                original = match[0].strip()
-                explanation = match[1].strip() if len(match) > 1 and match[1] else ""
-                
-                # 检查是否已处理过此原词
-                if original in processed_originals:
-                    continue
-                
-                # 查找是否已存在此文化表达
-                existing_expr = None
-                for expr in self.cultural_expressions:
-                    if expr.get("original") == original:
-                        existing_expr = expr
-                        break
-                
-                if existing_expr:
-                    # 如果存在则更新
-                    if explanation and not existing_expr.get("explanation"):
-                        existing_expr["explanation"] = explanation
-                    # 更新信息已完成
-                else:
-                    # 添加新文化表达
-                    new_expr = {
-                        "original": original,
-                        "translated": "",
-                        "explanation": explanation
-                    }
-                    self.cultural_expressions.append(new_expr)
-                    exprs_added += 1
+                    new_exprs.append(new_expr)
+                    expr_index[original] = new_expr
             
+            if new_exprs:
+                self.cultural_expressions.extend(new_exprs)
+            exprs_added = len(new_exprs)
             self.logger.info(f"解析到 {exprs_added} 个新文化表达")
             return exprs_added
         except Exception as e:
             self.logger.error(f"解析文化表达更新建议时出错: {str(e)}")
             return 0
     
-    def _save_all_terminology(self):
-        """保存所有术语库到对应文件"""
+    def flush(self, force=False):
+        """
+        将尚未保存的术语库改动写入文件
+        
+        Args:
+            force: 为 True 时立即写入；否则距上次写入不足 _FLUSH_INTERVAL 秒时推迟到之后的调用
+        
+        Returns:
+            bool: 本次是否成功写入了文件；写入失败时改动仍保留，下次调用会重试
+        """
+        if not self._dirty:
+            return False
+        if not force and time.monotonic() - self._last_flush < _FLUSH_INTERVAL:
+            return False
+        
+        with self._flush_lock:
+            if not self._dirty: # 等锁期间其他线程已经写入
+                return False
+            saved = self._write_pending()
+            if saved:
+                self._last_flush = time.monotonic()
+            return saved
+    
+    def _write_pending(self, parallel=True):
+        """
+        写入尚未保存的改动，调用方需持有 _flush_lock（对象回收时除外）。
+        先清除 _dirty 再序列化：保存期间其他线程新增的条目会重新标记，留给下一次写入；保存失败时恢复标记
+        
+        Returns:
+            bool: 是否全部保存成功
+        """
+        self._dirty = False
+        saved = self._save_all_terminology(parallel=parallel)
+        if not saved:
+            self._dirty = True
+        return saved
+    
+    def _save_all_terminology(self, parallel=True):
+        """保存所有术语库到对应文件，返回是否全部保存成功"""
         character_file = get_novel_character_file(self.novel_name)
         proper_nouns_file = get_novel_proper_nouns_file(self.novel_name)
         cultural_expressions_file = get_novel_cultural_expressions_file(self.novel_name)
         
-        self._save_file(character_file, self.characters)
-        self._save_file(proper_nouns_file, self.proper_nouns)
-        self._save_file(cultural_expressions_file, self.cultural_expressions)
+        saved = self._save_files([
+            (character_file, self.characters),
+            (proper_nouns_file, self.proper_nouns),
+            (cultural_expressions_file, self.cultural_expressions),
+        ], parallel=parallel)
         
-        self.logger.info(f"已保存小说「{self.novel_name}」的所有术语库文件")
+        if saved:
+            self.logger.info(f"已保存小说「{self.novel_name}」的所有术语库文件")
+        return saved
     
     def _save_terminology(self) -> bool:
         """
@@ -648,17 +802,14 @@ class TerminologyManager:
             # 确保术语库目录存在
             os.makedirs(config.TERMINOLOGY_DIR, exist_ok=True)
             
-            # 保存人物名称
-            with open(config.CHARACTER_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.characters, f, ensure_ascii=False, indent=2)
-                
-            # 保存专有名词
-            with open(config.PROPER_NOUNS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.proper_nouns, f, ensure_ascii=False, indent=2)
-                
-            # 保存文化表达
-            with open(config.CULTURAL_EXPRESSIONS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.cultural_expressions, f, ensure_ascii=False, indent=2)
+            # 保存人物名称、专有名词、文化表达
+            saved = self._save_files([
+                (config.CHARACTER_FILE, self.characters),
+                (config.PROPER_NOUNS_FILE, self.proper_nouns),
+                (config.CULTURAL_EXPRESSIONS_FILE, self.cultural_expressions),
+            ])
+            if not saved:
+                return False
                 
             logging.info("术语库已成功保存")
             return True
@@ -1,18 +1,162 @@
+import hashlib
+import io
 import json
 import logging
+import sqlite3
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
 import re
 import random
-from typing import Dict, Any, Optional
+import asyncio
+import functools
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple, Union
 import os # 需要 os.path.exists 和 os.path.basename
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时回退到标准库 json
+    orjson = None
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp 为可选依赖，仅异步并发翻译 (AsyncTranslatorAPI) 需要
+    aiohttp = None
+
 # 默认重试参数，如果构造函数未提供，则使用这些
 DEFAULT_API_TIMEOUT = 600
 DEFAULT_MAX_RETRIES_TRANSLATE = 5
 DEFAULT_MAX_RETRIES_TERMS = 7 # 术语提取可以多尝试几次
 DEFAULT_RETRY_DELAY = 5
 DEFAULT_MAX_RETRY_DELAY = 60
+DEFAULT_CIRCUIT_THRESHOLD = 3 # 连续彻底失败3次后熔断
+DEFAULT_CIRCUIT_COOLDOWN_SECONDS = 30
+CACHEABLE_MAX_TEMPERATURE = 0.1 # 只缓存温度不高于此值的请求，高温度输出本身是随机的，不应复用
+
+# 提示模板中静态前缀与动态部分的分隔标记；模板未使用该标记时，在第一个占位符所在行之前切开
+DYNAMIC_SPLIT_MARKER = "{{DYNAMIC_SPLIT}}"
+_PLACEHOLDER_RE = re.compile(r"\{(korean_text|chinese_text|terminology)\}")
+# 翻译提示只填入这两个占位符，其余花括号（包括 {chinese_text}）按原样保留
+_TRANSLATE_PLACEHOLDER_RE = re.compile(r"\{(korean_text|terminology)\}")
+
+# AI 思考过程标签，模块加载时编译一次
+_THINK_RE = re.compile(r'<think>.*?</think>', re.DOTALL)
+
+@functools.lru_cache(maxsize=32)
+def _read_template(abs_path: str, mtime: float) -> str:
+    """
+    读取提示模板文件。按 (绝对路径, 修改时间) 缓存，
+    多个 TranslatorPrompts 实例共用同一份内容，文件被修改后自动重新读取。
+    """
+    with open(abs_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _json_loads(raw: bytes) -> Any:
+    """解析JSON字节串，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _encode_request_body(data: Dict[str, Any]) -> bytes:
+    """把请求体序列化为 UTF-8 JSON 字节串，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+class _APIContextAdapter(logging.LoggerAdapter):
+    """
+    为 TranslatorAPI 的日志附加固定上下文。
+    每条记录带有 key（脱敏密钥）和 model 字段，供需要结构化日志的处理器使用；
+    消息末尾统一附加预先格式化好的 [密钥, 模型]，调用处不再各自拼接。
+    """
+
+    def __init__(self, logger: logging.Logger, extra: Dict[str, str]):
+        super().__init__(logger, extra)
+        self._suffix = f" [{extra['key']}, {extra['model']}]"
+
+    def process(self, msg, kwargs):
+        # 只在日志级别启用时才会被调用
+        kwargs["extra"] = {**self.extra, **kwargs["extra"]} if "extra" in kwargs else self.extra
+        return f"{msg}{self._suffix}", kwargs
+
+class TokenBucket:
+    """
+    令牌桶限流器：令牌以 rate_per_sec 的速度补充，最多积攒 capacity 个。
+    同一实例可在多个线程 (acquire) 和协程 (acquire_async) 间共享。
+    令牌不足时允许先扣成负数（预约），调用方按欠额等待，先到先得。
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        if rate_per_sec <= 0 or capacity <= 0:
+            raise ValueError("令牌桶的速率 (rate_per_sec) 和容量 (capacity) 必须大于0")
+        self.rate_per_sec = rate_per_sec
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, n_tokens: float) -> float:
+        """扣除 n_tokens 个令牌，返回需要等待的秒数"""
+        n_tokens = min(n_tokens, self.capacity) # 单次需求超过容量时按容量计，否则永远等不到
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_sec)
+            self._updated = now
+            self._tokens -= n_tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate_per_sec
+
+    def acquire(self, n_tokens: float = 1) -> float:
+        """获取令牌，不足时阻塞当前线程等待。返回等待的秒数。"""
+        wait = self._reserve(n_tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, n_tokens: float = 1) -> float:
+        """acquire 的异步版本，等待期间不阻塞事件循环"""
+        wait = self._reserve(n_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+# requests 网络层异常到重试预算类别的映射，按异常类型的 MRO 逐级查表
+# ConnectTimeout 同时继承 ConnectionError 与 Timeout，按超时处理，需单独列出
+_REQUEST_EXCEPTION_KINDS: Dict[type, Tuple[str, str]] = {
+    requests.exceptions.ConnectTimeout: ("timeout", "请求超时"),
+    requests.exceptions.Timeout: ("timeout", "请求超时"),
+    requests.exceptions.ConnectionError: ("network", "连接错误"),
+}
+
+def _request_exception_kind(error: Exception) -> Optional[Tuple[str, str]]:
+    """返回 (错误类别, 描述)；不在映射中的异常（如HTTP错误）返回None"""
+    for cls in type(error).__mro__:
+        kind = _REQUEST_EXCEPTION_KINDS.get(cls)
+        if kind is not None:
+            return kind
+    return None
+
+class _RetryableAPIError(Exception):
+    """
+    一次API调用尝试失败且可以重试。
+    kind 决定使用哪类特定错误的重试上限 ("timeout"、"network"、"parse" 或 "general")，
+    retry_after 为服务端通过 Retry-After 指定的等待秒数。
+    """
+
+    def __init__(self, kind: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+class CircuitOpenError(Exception):
+    """
+    熔断器处于打开状态：该实例（密钥）近期连续多次彻底失败，请求未发出即被拒绝。
+    retry_after 为距熔断器恢复的剩余秒数，调用方（如密钥轮换器）可据此立即换用其他密钥。
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 class TranslatorAPI:
     """
@@ -31,7 +175,14 @@ class TranslatorAPI:
                  max_retry_delay: int = DEFAULT_MAX_RETRY_DELAY,
                  network_error_retries: Optional[int] = None, # 如果为None，则使用max_retries
                  parse_error_retries: Optional[int] = None,   # 如果为None，则使用max_retries
-                 timeout_error_retries: Optional[int] = None  # 如果为None，则使用max_retries
+                 timeout_error_retries: Optional[int] = None, # 如果为None，则使用max_retries
+                 cache_path: Optional[str] = None,            # 响应缓存 SQLite 文件路径，为None时不缓存
+                 cache_ttl_seconds: Optional[float] = None,   # 缓存有效期（秒），为None时永不过期
+                 prompt_cache_control: bool = False,          # 是否为静态前缀添加显式的 cache_control 标记 (Anthropic 风格)
+                 requests_per_minute: Optional[float] = None, # 每分钟请求数上限，为None时不主动限流
+                 tokens_per_minute: Optional[float] = None,   # 每分钟输入token数上限（按提示长度估算），为None时不主动限流
+                 circuit_threshold: int = DEFAULT_CIRCUIT_THRESHOLD,               # 连续彻底失败多少次后打开熔断器
+                 circuit_cooldown_seconds: float = DEFAULT_CIRCUIT_COOLDOWN_SECONDS # 熔断器打开后拒绝请求的时长（秒）
                  ):
         if not api_key:
             raise ValueError("API密钥 (api_key) 不能为空")
@@ -45,6 +196,7 @@ class TranslatorAPI:
         self.model_name = model_name
         
         self.api_timeout = api_timeout
+        self.prompt_cache_control = prompt_cache_control
         self.max_retries_translate = max_retries_translate
         self.max_retries_terms = max_retries_terms
         self.retry_delay = retry_delay
@@ -59,170 +211,544 @@ class TranslatorAPI:
         self.parse_error_retries_terms = parse_error_retries or max_retries_terms
         self.timeout_error_retries_terms = timeout_error_retries or max_retries_terms
 
-        self.logger = logging.getLogger(__name__ + ".TranslatorAPI")
-        masked_key = self.api_key[:8] + "..." + self.api_key[-4:]
-        self.logger.info(f"TranslatorAPI 初始化: URL={self.api_url}, Model={self.model_name}, Key={masked_key}")
+        # 同一实例的所有请求复用连接（keep-alive），避免每次调用都重新进行 TCP/TLS 握手
+        self._session = requests.Session()
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        })
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0) # 重试由 _make_api_call 自行处理
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        self._masked_key = self.api_key[:8] + "..." + self.api_key[-4:] # 日志中使用的脱敏密钥，只计算一次
+        self.logger = _APIContextAdapter(
+            logging.getLogger(__name__ + ".TranslatorAPI"),
+            {"key": self._masked_key, "model": self.model_name}
+        )
+        self.logger.info(f"TranslatorAPI 初始化: URL={self.api_url}")
+
+        # 确定性请求的响应缓存：重复处理相同章节时直接返回上次的结果，不再调用API
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._cache: Optional[sqlite3.Connection] = None
+        self._cache_lock = threading.Lock() # 同一连接可能被多个线程使用，读写需串行
+        if cache_path:
+            self._cache = sqlite3.connect(cache_path, check_same_thread=False)
+            self._cache.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT, created_at REAL)")
+            self._cache.commit()
+            self.logger.info(f"已启用API响应缓存: {cache_path}")
+
+        # 主动限流：请求前在本地排队等待，而不是发出请求后再被服务端以 429 拒绝
+        self._request_limiter, self._token_limiter = self._shared_limiters(requests_per_minute, tokens_per_minute)
+
+        # 熔断器：认证失败或重试用尽计为一次彻底失败，连续达到阈值后在冷却期内直接拒绝请求，不再等待网络往返
+        self.circuit_threshold = circuit_threshold
+        self.circuit_cooldown_seconds = circuit_cooldown_seconds
+        self._consecutive_failures = 0
+        self._circuit_open_until = 0.0
+        self._circuit_lock = threading.Lock()
+
+    # 同一 (URL, 模型, 密钥, 配额) 的所有实例共用限流器，服务端配额也是按 (URL, 模型, 密钥) 计算的。
+    # 密钥只以哈希形式作为键保存；不同配置的组合数很少，条目不做清理
+    _rate_limiters: Dict[Tuple[str, str, str, Optional[float], Optional[float]], Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+    _rate_limiters_lock = threading.Lock()
+
+    def _shared_limiters(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        """
+        获取（必要时创建）与其他同配置实例共享的请求数与token数限流器。
+        桶容量为一分钟的配额，补充速度为配额/60秒。
+        """
+        if not requests_per_minute and not tokens_per_minute:
+            return None, None
+        key_hash = hashlib.sha256(self.api_key.encode("utf-8")).hexdigest()
+        account = (self.api_url, self.model_name, key_hash)
+        key = account + (requests_per_minute, tokens_per_minute)
+        with TranslatorAPI._rate_limiters_lock:
+            limiters = TranslatorAPI._rate_limiters.get(key)
+            if limiters is None:
+                # 同一密钥已按其他配额限流时，两组限流器各自放行，合计可能超过服务端配额
+                for other in TranslatorAPI._rate_limiters:
+                    if other[:3] == account:
+                        self.logger.warning(
+                            f"同一API密钥已存在不同的限流配置 (每分钟请求数 {other[3] or '不限'}, 每分钟token数 {other[4] or '不限'})，"
+                            f"两组限流器互相独立，合计请求量可能超过服务端配额"
+                        )
+                        break
+                limiters = (
+                    TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None,
+                    TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None,
+                )
+                TranslatorAPI._rate_limiters[key] = limiters
+                self.logger.info(f"已启用主动限流: 每分钟请求数 {requests_per_minute or '不限'}, 每分钟token数 {tokens_per_minute or '不限'}")
+        return limiters
+
+    @staticmethod
+    def _estimate_tokens(payload: bytes) -> int:
+        """粗略估算请求的输入token数：按请求体字节数的四分之一计"""
+        return len(payload) // 4
+
+    def _throttle(self, payload: bytes) -> None:
+        """发送请求前按配额等待"""
+        waited = 0.0
+        if self._request_limiter is not None:
+            waited += self._request_limiter.acquire(1)
+        if self._token_limiter is not None:
+            waited += self._token_limiter.acquire(self._estimate_tokens(payload))
+        if waited > 0:
+            self.logger.debug(f"主动限流，等待 {waited:.2f} 秒")
+
+    async def _throttle_async(self, payload: bytes) -> None:
+        """_throttle 的异步版本"""
+        waited = 0.0
+        if self._request_limiter is not None:
+            waited += await self._request_limiter.acquire_async(1)
+        if self._token_limiter is not None:
+            waited += await self._token_limiter.acquire_async(self._estimate_tokens(payload))
+        if waited > 0:
+            self.logger.debug(f"主动限流，等待 {waited:.2f} 秒")
+
+    def close(self) -> None:
+        """关闭连接池和响应缓存，释放保持的连接。实例不再使用时调用。"""
+        self._session.close()
+        if self._cache is not None:
+            with self._cache_lock:
+                self._cache.close()
+            self._cache = None
+
+    def _request_key(self, prompt: str, temperature: float, system_prefix: Optional[str] = None) -> Optional[str]:
+        """计算标识请求内容的键 sha256(模型|温度|提示)；温度过高（输出随机）时返回 None"""
+        if temperature > CACHEABLE_MAX_TEMPERATURE:
+            return None
+        if system_prefix:
+            prompt = f"{system_prefix}\0{prompt}"
+        return hashlib.sha256(f"{self.model_name}|{temperature}|{prompt}".encode("utf-8")).hexdigest()
+
+    def _cache_key(self, prompt: str, temperature: float, system_prefix: Optional[str] = None) -> Optional[str]:
+        """计算请求的缓存键；未启用缓存或温度过高（输出随机）时返回 None"""
+        if self._cache is None:
+            return None
+        return self._request_key(prompt, temperature, system_prefix)
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        """读取未过期的缓存响应，未命中时返回 None"""
+        try:
+            with self._cache_lock:
+                row = self._cache.execute("SELECT response, created_at FROM cache WHERE key=?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"读取响应缓存失败: {str(e)}")
+            return None
+        if row is None:
+            return None
+        response, created_at = row
+        if self.cache_ttl_seconds is not None and time.time() - created_at > self.cache_ttl_seconds:
+            return None
+        return response
+
+    def _cache_put(self, key: str, response: str) -> None:
+        """写入缓存，失败只记录日志，不影响本次调用的结果"""
+        try:
+            with self._cache_lock:
+                self._cache.execute(
+                    "INSERT OR REPLACE INTO cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                self._cache.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"写入响应缓存失败: {str(e)}")
 
     def _remove_thinking(self, text: str) -> str:
         """移除AI思考过程，也就是<think>...</think>标签之间的内容"""
-        cleaned_text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL).strip()
+        if '<think>' not in text: # 常见情况：没有思考内容，无需启动正则引擎
+            return text.strip()
+        cleaned_text = _THINK_RE.sub('', text).strip()
         if cleaned_text != text:
             self.logger.debug(f"已移除思考内容，原长度: {len(text)}，新长度: {len(cleaned_text)}")
         return cleaned_text
 
-    def _make_api_call(self, prompt: str, temperature: float, request_type: str) -> str:
+    def _retry_limits(self, request_type: str) -> Tuple[int, int, int, int]:
         """
-        执行API调用。
-
-        参数:
-            prompt: 提示文本。
-            temperature: 温度参数（控制随机性）。
-            request_type: 请求类型 ("translate" 或 "terms")，用于选择重试策略。
+        根据请求类型选择重试次数。
 
         返回:
-            API响应文本。
-        
-        抛出:
-            Exception: 如果所有重试均失败。
+            (通用重试上限, 网络错误重试上限, 解析错误重试上限, 超时错误重试上限)
         """
         if request_type == "translate":
-            max_retries = self.max_retries_translate
-            network_error_retries = self.network_error_retries_translate
-            parse_error_retries = self.parse_error_retries_translate
-            timeout_error_retries = self.timeout_error_retries_translate
-        elif request_type == "terms":
-            max_retries = self.max_retries_terms
-            network_error_retries = self.network_error_retries_terms
-            parse_error_retries = self.parse_error_retries_terms
-            timeout_error_retries = self.timeout_error_retries_terms
-        else:
-            # 默认使用翻译的重试次数，或者可以抛出错误
-            self.logger.warning(f"未知的 request_type: {request_type}，将使用翻译重试策略。")
-            max_retries = self.max_retries_translate
-            network_error_retries = self.network_error_retries_translate
-            parse_error_retries = self.parse_error_retries_translate
-            timeout_error_retries = self.timeout_error_retries_translate
-
-        retry_count = 0
-        last_error = "No error recorded"
+            return (self.max_retries_translate, self.network_error_retries_translate,
+                    self.parse_error_retries_translate, self.timeout_error_retries_translate)
+        if request_type == "terms":
+            return (self.max_retries_terms, self.network_error_retries_terms,
+                    self.parse_error_retries_terms, self.timeout_error_retries_terms)
+        # 默认使用翻译的重试次数，或者可以抛出错误
+        self.logger.warning(f"未知的 request_type: {request_type}，将使用翻译重试策略。")
+        return (self.max_retries_translate, self.network_error_retries_translate,
+                self.parse_error_retries_translate, self.timeout_error_retries_translate)
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+    def _build_request_data(self, prompt: str, temperature: float, system_prefix: Optional[str] = None) -> Dict[str, Any]:
+        """
+        构建请求体。
 
-        data = {
+        提供 system_prefix 时，它作为第一条 system 消息发送，prompt 作为 user 消息。
+        前缀在各次调用间逐字节相同，服务商可以复用已缓存的前缀，降低费用和首字延迟；
+        启用 prompt_cache_control 时额外附带 cache_control 标记，用于需要显式声明缓存的服务商。
+        """
+        messages = []
+        if system_prefix:
+            if self.prompt_cache_control:
+                messages.append({
+                    "role": "system",
+                    "content": [{"type": "text", "text": system_prefix, "cache_control": {"type": "ephemeral"}}]
+                })
+            else:
+                messages.append({"role": "system", "content": system_prefix})
+        messages.append({"role": "user", "content": prompt})
+        return {
             "model": self.model_name,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
+            "messages": messages,
             "temperature": temperature
         }
 
-        while retry_count <= max_retries:
-            should_retry = False
-            current_max_specific_retries = max_retries # 默认特定错误重试上限为通用上限
+    def _extract_response_text(self, result: Dict[str, Any], request_type: str) -> str:
+        """
+        从解析后的响应JSON中取出生成文本，并移除思考内容。
 
-            try:
-                if retry_count > 0:
-                    self.logger.info(f"API调用重试 ({retry_count}/{max_retries}) for {request_type}...")
-                
-                self.logger.debug(f"API请求数据 ({request_type}): {json.dumps(data, ensure_ascii=False)[:500]}...")
-                request_start_time = time.time()
-
-                response = requests.post(
-                    self.api_url,
-                    headers=headers,
-                    json=data,
-                    timeout=self.api_timeout
-                )
-                request_duration = time.time() - request_start_time
-                self.logger.info(f"API响应时间 ({request_type}): {request_duration:.2f}秒, Status: {response.status_code}")
+        抛出:
+            ValueError: 如果响应内容为空或无效。
+        """
+        response_text = None
+        if "choices" in result and len(result["choices"]) > 0:
+            choice = result["choices"][0]
+            if "message" in choice and "content" in choice["message"]:
+                response_text = choice["message"]["content"]
+            elif "text" in choice: # 兼容旧API
+                response_text = choice["text"]
+        elif "content" in result: # 有些模型可能直接在顶层返回 content
+             response_text = result["content"] if isinstance(result["content"], str) else str(result)
+        
+        if response_text is None : # 如果还没找到，并且没有choices，尝试整个结果转字符串
+            self.logger.warning(
+                f"API响应 ({request_type}) 中没有找到明确的文本字段 ('content'/'text' in choices or top-level 'content')。 "
+                f"将尝试使用整个响应的字符串形式。这可能需要后续处理。响应: {str(result)[:200]}..."
+            )
+            response_text = str(result)
+
+        return self._clean_response_text(response_text, request_type)
+
+    def _clean_response_text(self, response_text: str, request_type: str) -> str:
+        """
+        检查生成文本是否为空，并移除思考内容。
+
+        抛出:
+            ValueError: 如果响应内容为空或无效。
+        """
+        if not response_text or response_text.isspace(): # 检查API返回是否为空；isspace 不会像 strip 那样复制整段文本
+            raise ValueError(f"API ({request_type}) 返回内容为空或无效: '{response_text}'")
+
+        return self._remove_thinking(response_text)
+
+    @staticmethod
+    def _read_event_stream(response, on_token: Optional[Callable[[str], None]]) -> str:
+        """
+        逐行读取 OpenAI 风格的 SSE 流式响应，拼接各片段 choices[0].delta.content。
+
+        参数:
+            response: 以 stream=True 发出的 requests 响应对象。
+            on_token: 可选回调，每收到一段文本即调用一次。
+
+        返回:
+            拼接后的完整生成文本。
+        """
+        buffer = io.StringIO()
+        for raw_line in response.iter_lines():
+            # 按字节读取后自行以 UTF-8 解码：text/event-stream 未声明字符集时 requests 会按 ISO-8859-1 解码
+            if not raw_line.startswith(b"data:"):
+                continue
+            payload = raw_line[5:].strip()
+            if payload == b"[DONE]":
+                break
+            choices = _json_loads(payload).get("choices")
+            if not choices:
+                continue
+            token = (choices[0].get("delta") or {}).get("content")
+            if token:
+                buffer.write(token)
+                if on_token is not None:
+                    on_token(token)
+        return buffer.getvalue()
+
+    def _retry_sleep_time(self, retry_count: int) -> float:
+        """指数退避加随机抖动的重试等待时间（秒）"""
+        return min(
+            self.retry_delay * (2 ** (retry_count - 1)) * (1 + random.random() * 0.2),
+            self.max_retry_delay
+        )
+
+    @staticmethod
+    def _response_preview(response, limit: int = 200) -> str:
+        """
+        取错误响应体的前 limit 个字节用于日志。
+        只解码这一小段，而不是像 response.text 那样先把整个响应体解码成字符串再截取。
+        """
+        try:
+            return response.content[:limit].decode("utf-8", "replace")
+        except Exception: # 流式响应在出错前已被关闭，读不到响应体
+            return ""
+
+    @staticmethod
+    def _retry_after_seconds(headers) -> Optional[float]:
+        """解析 Retry-After 响应头（秒数形式），缺失或无法解析时返回None"""
+        value = headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
 
+    def _attempt_once(self, payload: bytes, request_type: str, stream: bool = False,
+                      on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        发送一次API请求并解析响应，不做重试。
+
+        参数:
+            payload: 已序列化的 JSON 请求体，各次重试共用。
+            request_type: 请求类型，用于日志。
+            stream: 是否按 SSE 流式读取响应（请求体中应已设置 "stream": true）。
+            on_token: 流式读取时每收到一段文本调用的回调。
+
+        返回:
+            移除思考内容后的响应文本。
+
+        抛出:
+            _RetryableAPIError: 本次尝试失败，可以重试。
+            Exception: 认证失败 (401) 等不应重试的错误。
+        """
+        self._throttle(payload)
+        try:
+            # 序列化整个请求体开销不小，只在确实输出 DEBUG 日志时才进行
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"API请求数据 ({request_type}): {payload[:500].decode('utf-8', 'replace')}...")
+            request_start_time = time.time()
+
+            # 请求头中已设置 Content-Type: application/json，直接发送预先序列化好的字节
+            response = self._session.post(
+                self.api_url,
+                data=payload,
+                timeout=self.api_timeout,
+                stream=stream
+            )
+            request_duration = time.time() - request_start_time
+            self.logger.info(f"API响应时间 ({request_type}): {request_duration:.2f}秒, Status: {response.status_code}")
+
+            if stream:
+                # 生成与传输重叠进行，内容边到达边交给 on_token；读完后释放连接
+                try:
+                    response.raise_for_status()  # HTTP错误会在这里抛出
+                    response_text = self._read_event_stream(response, on_token)
+                finally:
+                    response.close()
+                self.logger.debug(f"API流式响应读取完成 ({request_type})，耗时: {time.time() - request_start_time:.2f}秒")
+                cleaned_text = self._clean_response_text(response_text, request_type)
+            else:
                 response.raise_for_status()  # HTTP错误会在这里抛出
-                result = response.json()
-                self.logger.debug(f"API响应原始数据 ({request_type}): {json.dumps(result, ensure_ascii=False)[:500]}...")
-
-                response_text = None
-                if "choices" in result and len(result["choices"]) > 0:
-                    choice = result["choices"][0]
-                    if "message" in choice and "content" in choice["message"]:
-                        response_text = choice["message"]["content"]
-                    elif "text" in choice: # 兼容旧API
-                        response_text = choice["text"]
-                elif "content" in result: # 有些模型可能直接在顶层返回 content
-                     response_text = result["content"] if isinstance(result["content"], str) else str(result)
-                
-                if response_text is None : # 如果还没找到，并且没有choices，尝试整个结果转字符串
-                    self.logger.warning(
-                        f"API响应 ({request_type}) 中没有找到明确的文本字段 ('content'/'text' in choices or top-level 'content')。 "
-                        f"将尝试使用整个响应的字符串形式。这可能需要后续处理。响应: {str(result)[:200]}..."
-                    )
-                    response_text = str(result)
-
-                if not response_text or len(response_text.strip()) < 1: # 检查API返回是否为空
-                    raise ValueError(f"API ({request_type}) 返回内容为空或无效: '{response_text}'")
-
-                cleaned_text = self._remove_thinking(response_text)
-                self.logger.info(f"API调用成功 ({request_type})，响应长度: {len(cleaned_text)}字符")
-                return cleaned_text
-
-            except requests.exceptions.Timeout as e:
-                last_error = f"请求超时 ({request_type}): {str(e)}"
-                current_max_specific_retries = timeout_error_retries
-            except requests.exceptions.ConnectionError as e:
-                last_error = f"连接错误 ({request_type}): {str(e)}"
-                current_max_specific_retries = network_error_retries
-            except requests.exceptions.RequestException as e: # HTTP错误等
-                last_error = f"请求异常 ({request_type}): {str(e)} (Status: {e.response.status_code if e.response else 'N/A'})
- Response: {e.response.text[:200] if e.response else 'N/A'}..."
-                if e.response is not None:
-                    if e.response.status_code == 401: # 认证失败
-                        self.logger.error(f"API认证失败 (401) for {request_type} with key {self.api_key[:8]}... 请检查API密钥。")
-                        # 认证错误不应重试，直接抛出
-                        raise Exception(f"API认证失败 (401) for {request_type}. Key: {self.api_key[:8]}...") 
-                    if e.response.status_code == 429: # 速率限制
-                        self.logger.warning(f"API速率限制 (429) for {request_type} with key {self.api_key[:8]}...")
-                        # 速率限制错误也应该由ApiKeyRotator处理，这里只记录
-                # 对于其他HTTP错误，使用通用重试逻辑
-                current_max_specific_retries = max_retries
-            except (ValueError, json.JSONDecodeError) as e: # 包括API返回内容为空的ValueError
-                last_error = f"响应解析错误或内容无效 ({request_type}): {str(e)}"
-                current_max_specific_retries = parse_error_retries
-            except Exception as e:
-                last_error = f"未知错误 ({request_type}): {str(e)}"
-                current_max_specific_retries = max_retries # 未知错误使用通用重试
-
-            retry_count += 1
-            if retry_count <= max_retries and retry_count <= current_max_specific_retries:
-                should_retry = True
-            
-            if should_retry:
-                sleep_time = min(
-                    self.retry_delay * (2 ** (retry_count - 1)) * (1 + random.random() * 0.2),
-                    self.max_retry_delay
+                raw = response.content
+                result = _json_loads(raw) # 直接解析响应字节，省去先解码为字符串的一步
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"API响应原始数据 ({request_type}): {raw[:500].decode('utf-8', 'replace')}...")
+
+                cleaned_text = self._extract_response_text(result, request_type)
+        except requests.exceptions.RequestException as e: # 超时、连接错误、HTTP错误等
+            kind = _request_exception_kind(e)
+            if kind is not None:
+                raise _RetryableAPIError(kind[0], f"{kind[1]} ({request_type}): {str(e)}") from e
+            # 注意 Response 的真值取决于状态码是否成功，这里必须与 None 比较
+            status = e.response.status_code if e.response is not None else 'N/A'
+            body = self._response_preview(e.response) if e.response is not None else 'N/A'
+            retry_after = None
+            if e.response is not None:
+                if e.response.status_code == 401: # 认证失败
+                    self.logger.error(f"API认证失败 (401) for {request_type}，请检查API密钥。")
+                    # 认证错误不应重试，直接抛出
+                    raise Exception(f"API认证失败 (401) for {request_type}. Key: {self._masked_key}")
+                if e.response.status_code == 429: # 速率限制
+                    self.logger.warning(f"API速率限制 (429) for {request_type}")
+                    # 服务端指定了等待时间时按其等待，而不是按指数退避猜测
+                    retry_after = self._retry_after_seconds(e.response.headers)
+            # 对于其他HTTP错误，使用通用重试逻辑
+            raise _RetryableAPIError("general", f"请求异常 ({request_type}): {str(e)} (Status: {status}) Response: {body}...", retry_after) from e
+        except (ValueError, json.JSONDecodeError) as e: # 包括API返回内容为空的ValueError
+            raise _RetryableAPIError("parse", f"响应解析错误或内容无效 ({request_type}): {str(e)}") from e
+        except Exception as e:
+            raise _RetryableAPIError("general", f"未知错误 ({request_type}): {str(e)}") from e # 未知错误使用通用重试
+
+        self.logger.info(f"API调用成功 ({request_type})，响应长度: {len(cleaned_text)}字符")
+        return cleaned_text
+
+    def _next_retry_delay(self, error: "_RetryableAPIError", retry_count: int, limits: Tuple[int, int, int, int], request_type: str) -> Optional[float]:
+        """
+        计算第 retry_count 次重试前的等待时间（秒）；超过通用或该类错误的重试上限时返回 None。
+
+        参数:
+            error: 本次尝试的错误。
+            retry_count: 即将进行的重试次数（从1开始）。
+            limits: _retry_limits 返回的重试上限。
+            request_type: 请求类型，用于日志。
+        """
+        max_retries, network_error_retries, parse_error_retries, timeout_error_retries = limits
+        current_max_specific_retries = {
+            "network": network_error_retries,
+            "parse": parse_error_retries,
+            "timeout": timeout_error_retries,
+        }.get(error.kind, max_retries) # 其他错误的特定重试上限即为通用上限
+
+        if retry_count > max_retries or retry_count > current_max_specific_retries:
+            self.logger.error(f"已达到最大重试次数 ({retry_count-1}) for {request_type}，放弃API调用。最后错误: {error}")
+            return None
+
+        sleep_time = error.retry_after if error.retry_after is not None else self._retry_sleep_time(retry_count)
+        self.logger.warning(f"API调用失败 ({retry_count}/{max_retries if max_retries == current_max_specific_retries else str(max_retries) + '(general)/' + str(current_max_specific_retries) + '(specific)'}) [{request_type}]: {error}")
+        self.logger.info(f"等待 {sleep_time:.1f} 秒后重试 ({request_type})...")
+        return sleep_time
+
+    def _retries_exhausted(self, error: "_RetryableAPIError", retry_count: int, request_type: str) -> Exception:
+        """所有重试都失败时构建最终抛出的异常"""
+        error_message = f"API ({request_type}) 调用失败，已重试 {retry_count-1} 次: {error}"
+        self.logger.error(error_message) # 日志上下文中已带有脱敏密钥
+        return Exception(f"{error_message} [API密钥: {self._masked_key}]")
+
+    def _check_circuit(self, request_type: str) -> None:
+        """熔断器打开时抛出 CircuitOpenError，不发出请求"""
+        remaining = self._circuit_open_until - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenError(
+                f"API ({request_type}) 熔断中，{remaining:.0f} 秒内不再发送请求 [API密钥: {self._masked_key}]",
+                remaining
+            )
+
+    def _record_success(self) -> None:
+        """请求成功，清零连续失败计数"""
+        if self._consecutive_failures:
+            with self._circuit_lock:
+                self._consecutive_failures = 0
+
+    def _record_failure(self, request_type: str) -> None:
+        """记录一次彻底失败，连续失败达到阈值时打开熔断器"""
+        with self._circuit_lock:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.circuit_threshold:
+                self._circuit_open_until = time.monotonic() + self.circuit_cooldown_seconds
+                self._consecutive_failures = 0
+                self.logger.error(
+                    f"API ({request_type}) 连续 {self.circuit_threshold} 次调用失败，"
+                    f"熔断 {self.circuit_cooldown_seconds} 秒"
                 )
-                masked_key_info = self.api_key[:8] + "..." + self.api_key[-4:]
-                self.logger.warning(f"API调用失败 ({retry_count}/{max_retries if max_retries == current_max_specific_retries else str(max_retries) + '(general)/' + str(current_max_specific_retries) + '(specific)'}) [{masked_key_info}, {request_type}]: {last_error}")
-                self.logger.info(f"等待 {sleep_time:.1f} 秒后重试 ({request_type})...")
+
+    def _retry_sync(self, attempt: Callable[[], str], request_type: str) -> str:
+        """
+        同步重试驱动：反复执行 attempt，失败后用 time.sleep 退避，直到成功或用尽重试次数。
+
+        抛出:
+            Exception: 如果所有重试均失败，或 attempt 抛出了不应重试的错误。
+        """
+        self._check_circuit(request_type)
+        limits = self._retry_limits(request_type)
+        retry_count = 0
+        while True:
+            if retry_count > 0:
+                self.logger.info(f"API调用重试 ({retry_count}/{limits[0]}) for {request_type}...")
+            try:
+                result = attempt()
+            except _RetryableAPIError as e:
+                retry_count += 1
+                sleep_time = self._next_retry_delay(e, retry_count, limits, request_type)
+                if sleep_time is None:
+                    self._record_failure(request_type)
+                    raise self._retries_exhausted(e, retry_count, request_type) from e
                 time.sleep(sleep_time)
+            except Exception: # 认证失败等不可重试的错误
+                self._record_failure(request_type)
+                raise
             else:
-                self.logger.error(f"已达到最大重试次数 ({retry_count-1}) for {request_type}，放弃API调用。最后错误: {last_error}")
-                break
+                self._record_success()
+                return result
+
+    async def _retry_async(self, attempt: Callable[[], Awaitable[str]], request_type: str) -> str:
+        """
+        异步重试驱动：与 _retry_sync 相同，但用 await asyncio.sleep 退避，
+        一个请求等待重试期间，事件循环可以继续调度其他请求。
+        """
+        self._check_circuit(request_type)
+        limits = self._retry_limits(request_type)
+        retry_count = 0
+        while True:
+            if retry_count > 0:
+                self.logger.info(f"API调用重试 ({retry_count}/{limits[0]}) for {request_type}...")
+            try:
+                result = await attempt()
+            except _RetryableAPIError as e:
+                retry_count += 1
+                sleep_time = self._next_retry_delay(e, retry_count, limits, request_type)
+                if sleep_time is None:
+                    self._record_failure(request_type)
+                    raise self._retries_exhausted(e, retry_count, request_type) from e
+                await asyncio.sleep(sleep_time)
+            except Exception: # 认证失败等不可重试的错误
+                self._record_failure(request_type)
+                raise
+            else:
+                self._record_success()
+                return result
+
+    def _make_api_call(self, prompt: str, temperature: float, request_type: str, system_prefix: Optional[str] = None,
+                       on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        执行API调用。
+
+        参数:
+            prompt: 提示文本。
+            temperature: 温度参数（控制随机性）。
+            request_type: 请求类型 ("translate" 或 "terms")，用于选择重试策略。
+            system_prefix: 可选的静态前缀，作为 system 消息放在 prompt 之前发送。
+            on_token: 可选回调。提供时以流式 (SSE) 请求，每收到一段文本即调用一次；
+                      重试时新的尝试会从头重新推送，命中缓存时整段文本推送一次。
+
+        返回:
+            API响应文本。
         
-        # 如果所有重试都失败
-        masked_key_info = self.api_key[:8] + "..." + self.api_key[-4:]
-        error_message = f"API ({request_type}) 调用失败，已重试 {retry_count-1} 次: {last_error} [API密钥: {masked_key_info}]"
-        self.logger.error(error_message)
-        raise Exception(error_message)
+        抛出:
+            CircuitOpenError: 如果熔断器处于打开状态，请求未发出。
+            Exception: 如果所有重试均失败。
+        """
+        cache_key = self._cache_key(prompt, temperature, system_prefix)
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self.logger.info(f"命中API响应缓存 ({request_type})，响应长度: {len(cached)}字符")
+                if on_token is not None:
+                    on_token(cached)
+                return cached
+
+        data = self._build_request_data(prompt, temperature, system_prefix)
+        stream = on_token is not None
+        if stream:
+            data["stream"] = True
+        # 请求体只序列化一次，重试时直接复用
+        payload = _encode_request_body(data)
+        cleaned_text = self._retry_sync(lambda: self._attempt_once(payload, request_type, stream, on_token), request_type)
+        if cache_key is not None:
+            self._cache_put(cache_key, cleaned_text)
+        return cleaned_text
 
-    def translate(self, prompt: str, temperature: float = 0.1) -> str:
+    def translate(self, prompt: str, temperature: float = 0.1, system_prefix: Optional[str] = None,
+                  on_token: Optional[Callable[[str], None]] = None) -> str:
         """
         翻译文本。
 
         参数:
-            prompt: 包含待翻译韩文和术语库的完整提示。
+            prompt: 包含待翻译韩文和术语库的提示（提供 system_prefix 时为其后的动态部分）。
             temperature: 生成文本的温度参数。
+            system_prefix: 可选的静态提示前缀，见 TranslatorPrompts.build_translation_parts。
+            on_token: 可选回调，提供时流式接收译文，每收到一段文本即调用一次（例如边接收边写入文件）。
+                      推送的是原始片段，可能包含 <think> 思考内容；返回值仍是清理后的完整译文。
 
         返回:
             翻译后的中文文本。
@@ -232,19 +758,21 @@ class TranslatorAPI:
         """
         self.logger.info(f"开始翻译文本 (temp={temperature})...")
         try:
-            response = self._make_api_call(prompt, temperature=temperature, request_type="translate")
+            response = self._make_api_call(prompt, temperature=temperature, request_type="translate",
+                                           system_prefix=system_prefix, on_token=on_token)
             return response
         except Exception as e:
             self.logger.error(f"翻译文本时出错: {str(e)}")
             raise # 重新抛出异常，让调用者处理
 
-    def extract_terms(self, prompt: str, temperature: float = 0.01) -> str:
+    def extract_terms(self, prompt: str, temperature: float = 0.01, system_prefix: Optional[str] = None) -> str:
         """
         从API提取术语信息 (例如，根据原文和译文建议新的术语)。
 
         参数:
-            prompt: 包含韩文原文、中文译文和现有术语库的提示。
+            prompt: 包含韩文原文、中文译文和现有术语库的提示（提供 system_prefix 时为其后的动态部分）。
             temperature: 生成文本的温度参数。
+            system_prefix: 可选的静态提示前缀，见 TranslatorPrompts.build_terminology_update_parts。
 
         返回:
             API返回的原始响应文本，预计包含术语信息。
@@ -254,7 +782,7 @@ class TranslatorAPI:
         """
         self.logger.info(f"开始从API提取术语 (temp={temperature})...")
         try:
-            response = self._make_api_call(prompt, temperature=temperature, request_type="terms")
+            response = self._make_api_call(prompt, temperature=temperature, request_type="terms", system_prefix=system_prefix)
             
             # 进一步验证响应，因为术语提取可能对格式有要求
             if not response or len(response.strip()) < 5: # 简单检查，具体检查应在TerminologyManager中
@@ -270,6 +798,176 @@ class TranslatorAPI:
                  self.logger.error(f"提取术语时出错: {str(e)}")
             raise # 重新抛出异常
 
+class AsyncTranslatorAPI(TranslatorAPI):
+    """
+    TranslatorAPI 的异步版本，基于 aiohttp 并发发送请求。
+    配置、重试策略和响应解析与 TranslatorAPI 相同；多个提示可通过 translate_batch 并发翻译，
+    各请求的等待时间相互重叠，吞吐量随并发数近似线性提升，直至触及服务商的速率限制。
+    """
+
+    def __init__(self, *args, **kwargs):
+        if aiohttp is None:
+            raise ImportError("异步翻译需要安装 aiohttp: pip install aiohttp")
+        super().__init__(*args, **kwargs)
+        self._async_session: Optional["aiohttp.ClientSession"] = None # 在事件循环中首次请求时创建
+        # 进行中的请求：相同内容的并发请求共用同一次API调用的结果 (single-flight)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        """获取（必要时创建）复用连接的 aiohttp 会话，必须在事件循环中调用"""
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(
+                headers=dict(self._session.headers),
+                connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.api_timeout)
+            )
+        return self._async_session
+
+    async def aclose(self) -> None:
+        """关闭异步会话和同步连接池"""
+        for task in list(self._in_flight.values()): # 调用方都已取消、仍在进行的共享请求
+            task.cancel()
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self.close()
+
+    async def _attempt_once_async(self, payload: bytes, request_type: str) -> str:
+        """
+        _attempt_once 的异步版本：发送一次API请求并解析响应，不做重试。
+
+        抛出:
+            _RetryableAPIError: 本次尝试失败，可以重试。
+            Exception: 认证失败 (401) 等不应重试的错误。
+        """
+        await self._throttle_async(payload)
+        session = self._get_async_session()
+        try:
+            request_start_time = time.time()
+            async with session.post(self.api_url, data=payload) as response:
+                body = await response.read()
+                request_duration = time.time() - request_start_time
+                self.logger.info(f"API响应时间 ({request_type}): {request_duration:.2f}秒, Status: {response.status}")
+                status = response.status
+                retry_after = self._retry_after_seconds(response.headers) if status == 429 else None
+        except asyncio.TimeoutError as e:
+            raise _RetryableAPIError("timeout", f"请求超时 ({request_type}): {str(e)}") from e
+        except aiohttp.ClientConnectionError as e:
+            raise _RetryableAPIError("network", f"连接错误 ({request_type}): {str(e)}") from e
+        except Exception as e:
+            raise _RetryableAPIError("general", f"未知错误 ({request_type}): {str(e)}") from e # 未知错误使用通用重试
+
+        if status >= 400: # HTTP错误
+            if status == 401: # 认证失败
+                self.logger.error(f"API认证失败 (401) for {request_type}，请检查API密钥。")
+                # 认证错误不应重试，直接抛出
+                raise Exception(f"API认证失败 (401) for {request_type}. Key: {self._masked_key}")
+            if status == 429: # 速率限制
+                self.logger.warning(f"API速率限制 (429) for {request_type}")
+            raise _RetryableAPIError("general", f"请求异常 ({request_type}): (Status: {status}) Response: {body[:200].decode('utf-8', 'replace')}...", retry_after)
+
+        try:
+            cleaned_text = self._extract_response_text(_json_loads(body), request_type)
+        except (ValueError, json.JSONDecodeError) as e: # 包括API返回内容为空的ValueError
+            raise _RetryableAPIError("parse", f"响应解析错误或内容无效 ({request_type}): {str(e)}") from e
+
+        self.logger.info(f"API调用成功 ({request_type})，响应长度: {len(cleaned_text)}字符")
+        return cleaned_text
+
+    async def _make_api_call_async(self, prompt: str, temperature: float, request_type: str, system_prefix: Optional[str] = None) -> str:
+        """
+        _make_api_call 的异步版本，重试与退避逻辑相同，等待期间不阻塞事件循环。
+
+        参数:
+            prompt: 提示文本。
+            temperature: 温度参数（控制随机性）。
+            request_type: 请求类型 ("translate" 或 "terms")，用于选择重试策略。
+            system_prefix: 可选的静态前缀，作为 system 消息放在 prompt 之前发送。
+
+        返回:
+            API响应文本。
+        
+        抛出:
+            CircuitOpenError: 如果熔断器处于打开状态，请求未发出。
+            Exception: 如果所有重试均失败。
+        """
+        # 磁盘缓存处理先后重复的请求，single-flight 处理同时发生的重复请求；两者只对低温度请求生效
+        flight_key = self._request_key(prompt, temperature, system_prefix)
+        if flight_key is None:
+            return await self._call_uncached_async(prompt, temperature, request_type, system_prefix, None)
+
+        task = self._in_flight.get(flight_key)
+        if task is not None:
+            self.logger.info(f"相同请求 ({request_type}) 正在进行中，等待其结果")
+        else:
+            # 共享的请求作为独立任务运行，不属于任何一个调用方
+            cache_key = flight_key if self._cache is not None else None
+            task = asyncio.ensure_future(self._call_uncached_async(prompt, temperature, request_type, system_prefix, cache_key))
+            self._in_flight[flight_key] = task
+            task.add_done_callback(lambda done: self._finish_flight(flight_key, done))
+        # shield: 任一调用方（包括发起请求的第一个）被取消时，共享的请求和其他调用方都不受影响
+        return await asyncio.shield(task)
+
+    def _finish_flight(self, flight_key: str, task: "asyncio.Task") -> None:
+        """共享请求结束时从登记表中移除；并读取其异常，所有调用方都已取消时也不会在回收时告警"""
+        if self._in_flight.get(flight_key) is task:
+            del self._in_flight[flight_key]
+        if not task.cancelled():
+            task.exception()
+
+    async def _call_uncached_async(self, prompt: str, temperature: float, request_type: str,
+                                   system_prefix: Optional[str], cache_key: Optional[str]) -> str:
+        """查询磁盘缓存，未命中时发送请求并写入缓存"""
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                self.logger.info(f"命中API响应缓存 ({request_type})，响应长度: {len(cached)}字符")
+                return cached
+
+        payload = _encode_request_body(self._build_request_data(prompt, temperature, system_prefix))
+        cleaned_text = await self._retry_async(lambda: self._attempt_once_async(payload, request_type), request_type)
+        if cache_key is not None:
+            self._cache_put(cache_key, cleaned_text)
+        return cleaned_text
+
+    async def atranslate(self, prompt: str, temperature: float = 0.1, system_prefix: Optional[str] = None) -> str:
+        """translate 的异步版本"""
+        try:
+            return await self._make_api_call_async(prompt, temperature=temperature, request_type="translate", system_prefix=system_prefix)
+        except Exception as e:
+            self.logger.error(f"翻译文本时出错: {str(e)}")
+            raise
+
+    async def aextract_terms(self, prompt: str, temperature: float = 0.01, system_prefix: Optional[str] = None) -> str:
+        """extract_terms 的异步版本"""
+        response = await self._make_api_call_async(prompt, temperature=temperature, request_type="terms", system_prefix=system_prefix)
+        if not response or len(response.strip()) < 5:
+            self.logger.warning(f"API返回的术语提取响应内容为空或过短: '{response}'")
+            raise ValueError(f"API返回的术语提取响应内容为空或过短: '{response}'")
+        self.logger.info(f"术语提取API调用成功，响应长度: {len(response)} 字符")
+        return response
+
+    async def translate_batch(self, prompts: List[str], temperature: float = 0.1, max_concurrency: int = 8, system_prefix: Optional[str] = None) -> List[Union[str, Exception]]:
+        """
+        并发翻译多个提示，同时进行的请求数不超过 max_concurrency。
+
+        参数:
+            prompts: 提示列表。
+            temperature: 生成文本的温度参数。
+            max_concurrency: 最大并发请求数。
+            system_prefix: 所有提示共用的静态前缀。
+
+        返回:
+            与 prompts 顺序一致的结果列表；翻译失败的位置为对应的异常对象，不影响其他提示。
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _bounded(prompt: str) -> str:
+            async with semaphore:
+                return await self.atranslate(prompt, temperature=temperature, system_prefix=system_prefix)
+
+        return await asyncio.gather(*(_bounded(prompt) for prompt in prompts), return_exceptions=True)
+
 # TranslatorPrompts 类将在这里定义
 class TranslatorPrompts:
     """
@@ -286,6 +984,13 @@ class TranslatorPrompts:
 
         self.translate_prompt_template = self._load_prompt_template(translate_prompt_file_path, "翻译")
         self.term_update_prompt_template = self._load_prompt_template(term_update_prompt_file_path, "术语更新")
+
+        # 模板拆成静态前缀与动态部分，前缀在各次调用间保持逐字节相同，便于服务商缓存
+        self._translate_prefix, self._translate_dynamic = self._split_template(self.translate_prompt_template, "翻译", _TRANSLATE_PLACEHOLDER_RE)
+        self._term_update_prefix, self._term_update_dynamic = self._split_template(self.term_update_prompt_template, "术语更新", _PLACEHOLDER_RE)
+        # 动态部分预先切分为文本片段和占位符名，构建提示时只需按顺序拼接
+        self._translate_segments, self._translate_keys = self._compile_template(self._translate_dynamic, _TRANSLATE_PLACEHOLDER_RE)
+        self._term_update_segments, self._term_update_keys = self._compile_template(self._term_update_dynamic, _PLACEHOLDER_RE)
         
         self.logger.info("TranslatorPrompts 初始化完成。")
 
@@ -310,8 +1015,7 @@ class TranslatorPrompts:
                 self.logger.error(error_msg)
                 raise FileNotFoundError(error_msg)
             
-            with open(prompt_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = _read_template(os.path.abspath(prompt_file_path), os.path.getmtime(prompt_file_path))
             
             self.logger.info(f"成功加载{template_name}提示模板: {os.path.basename(prompt_file_path)}, 长度: {len(content)}字符")
             return content
@@ -319,6 +1023,67 @@ class TranslatorPrompts:
             self.logger.error(f"加载{template_name}提示模板 {prompt_file_path} 时出错: {str(e)}")
             raise # 重新抛出，让调用者处理或记录
 
+    def _split_template(self, template: str, template_name: str, placeholder_re: re.Pattern) -> Tuple[str, str]:
+        """
+        把模板拆成不含占位符的静态前缀和包含占位符的动态部分，两者拼接后与原模板相同。
+        模板中有 {{DYNAMIC_SPLIT}} 标记时在标记处切开（标记本身被移除），
+        否则在第一个占位符所在行的行首切开。
+
+        返回:
+            (静态前缀, 动态部分模板)
+        """
+        if DYNAMIC_SPLIT_MARKER in template:
+            prefix, _, dynamic = template.partition(DYNAMIC_SPLIT_MARKER)
+            if placeholder_re.search(prefix):
+                self.logger.warning(f"{template_name}提示模板的静态前缀中包含占位符，前缀缓存将无法生效")
+            return prefix, dynamic
+        match = placeholder_re.search(template)
+        if match is None:
+            return template, ""
+        cut = template.rfind("\n", 0, match.start()) + 1
+        return template[:cut], template[cut:]
+
+    @staticmethod
+    def _compile_template(template: str, placeholder_re: re.Pattern) -> Tuple[List[str], List[str]]:
+        """
+        在 placeholder_re 匹配的占位符处切分模板。模板中的其他花括号按原样保留。
+
+        返回:
+            (文本片段列表, 占位符名列表)，片段比占位符多一个，第 i 个占位符位于片段 i 与 i+1 之间
+        """
+        pieces = placeholder_re.split(template)
+        return pieces[0::2], pieces[1::2]
+
+    @staticmethod
+    def _render(segments: List[str], keys: List[str], values: Dict[str, str]) -> str:
+        """按顺序拼接文本片段和占位符对应的值；未提供值的占位符保持原样，值中的花括号不会被再次解析"""
+        out = [segments[0]]
+        for key, segment in zip(keys, segments[1:]):
+            out.append(values.get(key, "{" + key + "}"))
+            out.append(segment)
+        return "".join(out)
+
+    def build_translation_parts(self, korean_text: str, formatted_terminology: str) -> Tuple[str, str]:
+        """
+        构建翻译提示，分别返回静态前缀和动态部分。
+        前缀适合作为 TranslatorAPI.translate 的 system_prefix 发送。
+
+        参数:
+            korean_text: 需要翻译的韩文文本。
+            formatted_terminology: 格式化后的术语库字符串。
+
+        返回:
+            (静态前缀, 包含术语库和原文的动态部分)
+        """
+        # 填入占位符 {korean_text} 和 {terminology}
+        dynamic = self._render(self._translate_segments, self._translate_keys, {
+            "korean_text": korean_text,
+            "terminology": formatted_terminology or "无特定术语。" # 如果术语为空，提供默认值
+        })
+        
+        self.logger.debug(f"构建完成翻译提示，前缀长度: {len(self._translate_prefix)}字符, 动态部分长度: {len(dynamic)}字符")
+        return self._translate_prefix, dynamic
+
     def build_translation_prompt(self, korean_text: str, formatted_terminology: str) -> str:
         """
         构建翻译提示。
@@ -330,13 +1095,30 @@ class TranslatorPrompts:
         返回:
             完整的翻译提示字符串。
         """
-        final_prompt = self.translate_prompt_template
-        # 替换占位符，确保占位符的准确性，例如 {korean_text} 和 {terminology}
-        final_prompt = final_prompt.replace("{korean_text}", korean_text)
-        final_prompt = final_prompt.replace("{terminology}", formatted_terminology or "无特定术语。") # 如果术语为空，提供默认值
-        
-        self.logger.debug(f"构建完成翻译提示，总长度: {len(final_prompt)}字符")
-        return final_prompt
+        prefix, dynamic = self.build_translation_parts(korean_text, formatted_terminology)
+        return prefix + dynamic
+
+    def build_terminology_update_parts(self, korean_text: str, chinese_text: str, formatted_terminology: str) -> Tuple[str, str]:
+        """
+        构建术语更新提示，分别返回静态前缀和动态部分。
+
+        参数:
+            korean_text: 原韩文文本
+            chinese_text: 翻译后的中文文本
+            formatted_terminology: 格式化后的术语库字符串
+
+        返回:
+            (静态前缀, 包含术语库、原文和译文的动态部分)
+        """
+        # 填入占位符 {korean_text}, {chinese_text}, {terminology}
+        dynamic = self._render(self._term_update_segments, self._term_update_keys, {
+            "korean_text": korean_text,
+            "chinese_text": chinese_text,
+            "terminology": formatted_terminology or "无特定术语。" # 如果术语为空，提供默认值
+        })
+
+        self.logger.debug(f"构建完成术语更新提示，前缀长度: {len(self._term_update_prefix)}字符, 动态部分长度: {len(dynamic)}字符")
+        return self._term_update_prefix, dynamic
 
     def build_terminology_update_prompt(self, korean_text: str, chinese_text: str, formatted_terminology: str) -> str:
         """
@@ -350,14 +1132,8 @@ class TranslatorPrompts:
         返回:
             完整的术语更新提示字符串
         """
-        final_prompt = self.term_update_prompt_template
-        # 替换占位符，例如 {korean_text}, {chinese_text}, {terminology}
-        final_prompt = final_prompt.replace("{korean_text}", korean_text)
-        final_prompt = final_prompt.replace("{chinese_text}", chinese_text)
-        final_prompt = final_prompt.replace("{terminology}", formatted_terminology or "无特定术语。") # 如果术语为空，提供默认值
-
-        self.logger.debug(f"构建完成术语更新提示，总长度: {len(final_prompt)}字符")
-        return final_prompt
+        prefix, dynamic = self.build_terminology_update_parts(korean_text, chinese_text, formatted_terminology)
+        return prefix + dynamic
 
 # 可以考虑添加一个顶层 Translator 类来组合 TranslatorAPI 和 TranslatorPrompts
 # class Translator:
@@ -1,35 +1,50 @@
 import logging
+import logging.handlers
+import os
 import sys
 import config
 
-def setup_logging():
-    """Configures the logging for the application."""
+# 日志只需配置一次，重复调用 setup_logging 直接返回，避免重复添加处理器和重复打开日志文件
+_LOGGING_CONFIGURED = False
+
+def setup_logging(log_level=None, log_file=None, log_format=None, backup_count=None, max_bytes=None):
+    """
+    Configures the logging for the application.
+
+    只生效一次。basicConfig(force=True) 会关闭并移除根日志器上已有的全部处理器，
+    因此应在程序启动时、创建其他日志处理器之前调用
+    （并行协调器的日志队列在 run_parallel_translation 运行时才包装当时的处理器，不受影响）。
+    """
+    global _LOGGING_CONFIGURED
+    if _LOGGING_CONFIGURED:
+        return
+
+    # 未指定的参数使用 config.py 中的设置
+    log_level = config.LOG_LEVEL if log_level is None else log_level
+    log_file = log_file or config.LOG_FILE
+    log_format = log_format or config.LOG_FORMAT
+    backup_count = config.LOG_BACKUP_COUNT if backup_count is None else backup_count
+    max_bytes = config.LOG_MAX_BYTES if max_bytes is None else max_bytes
+
     # Ensure log directory exists
-    os.makedirs(config.LOG_DIR, exist_ok=True)
+    # 只给出文件名时 dirname 为空，日志写在当前目录，无需创建
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
 
     # Create handlers
-    file_handler = logging.FileHandler(config.LOG_FILE, encoding='utf-8')
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
     console_handler = logging.StreamHandler(sys.stdout)
 
-    # Set formatters
-    formatter = logging.Formatter(config.LOG_FORMAT)
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-
-    # Get root logger and set level
-    logger = logging.getLogger()
-    logger.setLevel(config.LOG_LEVEL)
-
-    # Add handlers if they don't already exist
-    if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    elif not any(isinstance(h, logging.FileHandler) for h in logger.handlers):
-         logger.addHandler(file_handler)
-    elif not any(isinstance(h, logging.StreamHandler) for h in logger.handlers):
-         logger.addHandler(console_handler)
+    # force=True 会先移除根日志器上已有的处理器，不必再逐个检查处理器类型
+    logging.basicConfig(
+        level=log_level,
+        format=log_format,
+        handlers=[file_handler, console_handler],
+        force=True
+    )
+    _LOGGING_CONFIGURED = True
 
     logging.info("日志记录已设置完成。")
-
-# Import os for makedirs, needs to be at the top
-import os 
\ No newline at end of file